@@ -0,0 +1,133 @@
+import asyncio
+from typing import Dict, List, Sequence
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+import structlog
+from app.config import get_settings
+from app.db.models import Article, ArticleSignature, LSHBucket
+from app.db.bulk import insert_ignore
+from app.db.chunked import iter_chunks
+from app.services.deduplicator import MinHasher, LSHIndex
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+# Keeps IN (...) lists well under SQLite's bound-parameter limit
+LOOKUP_SLICE = 500
+
+class DeduplicationAgent:
+    """
+    Clusters near-duplicate articles (syndicated wire copy, reprinted PIB releases) under a
+    canonical article before classification, so LLM work is paid once per story.
+    New articles get a MinHash signature; LSH buckets persisted in the DB give candidates
+    via indexed lookups, and candidates are confirmed by estimated Jaccard >= DEDUP_THRESHOLD.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.hasher = MinHasher()
+
+    async def run(self):
+        logger.info("agent_start", agent="DeduplicationAgent")
+        if not settings.DEDUP_ENABLED:
+            return {"status": "skipped", "reason": "Dedup disabled"}
+
+        processed, duplicates = 0, 0
+        async for rows in iter_chunks(
+            self.db,
+            [Article.id, Article.content_clean],
+            *self._pending(),
+        ):
+            processed += len(rows)
+            duplicates += len(await self._process_chunk(rows))
+            # Commit per chunk so the index only ever contains fully processed articles
+            await self.db.commit()
+
+        logger.info("agent_complete", agent="DeduplicationAgent", processed=processed, duplicates=duplicates)
+        return {"status": "success", "processed": processed, "duplicates": duplicates}
+
+    @staticmethod
+    def _pending() -> tuple:
+        unsigned = ~select(ArticleSignature.article_id).where(ArticleSignature.article_id == Article.id).exists()
+        return (Article.content_clean != None, Article.is_valid == True, unsigned)
+
+    async def dedup_ids(self, ids: Sequence[str]) -> List[str]:
+        """Streaming entry point: clusters the given articles, returns those that are not duplicates."""
+        if not settings.DEDUP_ENABLED:
+            return list(ids)
+        res = await self.db.execute(select(Article.id, Article.content_clean).where(Article.id.in_(list(ids)), *self._pending()))
+        rows = res.all()
+        duplicates = await self._process_chunk(rows) if rows else {}
+        await self.db.commit()
+        return [article_id for article_id in ids if article_id not in duplicates]
+
+    async def _process_chunk(self, rows) -> Dict[str, str]:
+        """Signs and indexes one chunk; returns {duplicate_id: canonical_id} for the duplicates found."""
+        # Signatures are pure NumPy work - keep it off the event loop
+        signatures = await asyncio.to_thread(
+            lambda: {row.id: self.hasher.signature(row.content_clean) for row in rows}
+        )
+        signatures = {k: v for k, v in signatures.items() if v is not None}
+        chunk_index = LSHIndex()
+        keys = {article_id: chunk_index.band_keys(sig) for article_id, sig in signatures.items()}
+
+        # 1. Candidates from the persisted index: one indexed lookup per slice of band keys
+        all_keys = sorted({k for ks in keys.values() for k in ks})
+        persisted = {}
+        for i in range(0, len(all_keys), LOOKUP_SLICE):
+            res = await self.db.execute(
+                select(LSHBucket.band_key, LSHBucket.article_id).where(LSHBucket.band_key.in_(all_keys[i:i + LOOKUP_SLICE]))
+            )
+            for band_key, article_id in res.all():
+                persisted.setdefault(band_key, set()).add(article_id)
+
+        # 2. Their signatures and canonical ids, to verify and resolve clusters
+        candidate_ids = sorted({a for ids in persisted.values() for a in ids})
+        known_sigs, canonical_of = {}, {}
+        for i in range(0, len(candidate_ids), LOOKUP_SLICE):
+            res = await self.db.execute(
+                select(ArticleSignature.article_id, ArticleSignature.signature, Article.canonical_id)
+                .join(Article, Article.id == ArticleSignature.article_id)
+                .where(ArticleSignature.article_id.in_(candidate_ids[i:i + LOOKUP_SLICE]))
+            )
+            for article_id, raw, canonical_id in res.all():
+                known_sigs[article_id] = MinHasher.from_bytes(raw)
+                canonical_of[article_id] = canonical_id or article_id
+
+        # 3. Resolve each new article against persisted + earlier-in-chunk articles
+        updates = []
+        for article_id, sig in signatures.items():
+            candidates = {a for k in keys[article_id] for a in persisted.get(k, ())}
+            candidates |= chunk_index.candidates(keys[article_id])
+
+            best_id, best_score = None, 0.0
+            for candidate in candidates:
+                # Buckets can outlive their article/signature rows (deletes, partial inserts)
+                sig_b = known_sigs.get(candidate)
+                if sig_b is None:
+                    continue
+                score = MinHasher.similarity(sig, sig_b)
+                if score > best_score:
+                    best_id, best_score = candidate, score
+
+            if best_id is not None and best_score >= settings.DEDUP_THRESHOLD:
+                canonical_id = canonical_of[best_id]
+                canonical_of[article_id] = canonical_id
+                updates.append({"id": article_id, "canonical_id": canonical_id})
+            else:
+                canonical_of[article_id] = article_id
+
+            known_sigs[article_id] = sig
+            chunk_index.add(article_id, sig)
+
+        # 4. Persist signatures, buckets and cluster assignments
+        await insert_ignore(self.db, ArticleSignature, [
+            {"article_id": article_id, "signature": MinHasher.to_bytes(sig)} for article_id, sig in signatures.items()
+        ])
+        await insert_ignore(self.db, LSHBucket, [
+            {"band_key": k, "article_id": article_id} for article_id, ks in keys.items() for k in ks
+        ])
+        if updates:
+            await self.db.execute(update(Article), updates)
+        return {u["id"]: u["canonical_id"] for u in updates}
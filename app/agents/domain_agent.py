@@ -1,41 +1,252 @@
+import asyncio
+import re
+from typing import Sequence
+from sqlalchemy import func, or_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import aliased
 import structlog
+from app.config import get_settings
 from app.db.models import Article
+from app.db.chunked import iter_chunks
 from app.core.llm_client import LLMClient
+from app.core.concurrency import BoundedExecutor
+from app.core.metrics import DOMAIN_LOCAL
+from app.services.domain_classifier import NaiveBayesTrainer, document, get_domain_classifier, is_audited
 
 logger = structlog.get_logger()
+settings = get_settings()
+
+# Strict batch answer line: "<ID> -> <Domain>"
+BATCH_LINE_RE = re.compile(r'^\s*(\d+)\s*->\s*(.+?)\s*$')
 
 class DomainAgent:
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.llm = LLMClient()
+        self.llm = LLMClient(agent_name="DomainAgent")
+        self.executor = BoundedExecutor()
         self.domains = ["Politics", "Economy", "Environment", "Technology", "Law & Governance"]
+        self.local = get_domain_classifier()
+        self.stats = {"local": 0, "llm": 0, "audit_agree": 0, "audit_disagree": 0}
 
     async def run(self):
         logger.info("agent_start", agent="DomainAgent")
-        
-        # Get unclassified valid articles
-        # Rule 6: Token-efficient - only classify what we need
+
+        if settings.DOMAIN_LOCAL_ENABLED:
+            await self._maybe_retrain()
+
+        # Get unclassified valid articles, streamed in keyset pages
+        # Rule 6: Token-efficient - only classify what we need: canonical articles only,
+        # near-duplicates (canonical_id set by DeduplicationAgent) inherit the label below
+        count = 0
+        async for rows in iter_chunks(
+            self.db,
+            [Article.id, Article.title, Article.content_clean],
+            *self._pending(),
+        ):
+            count += await self._classify_rows(rows)
+
+        inherited = await self._propagate_to_duplicates()
+
+        logger.info("agent_complete", agent="DomainAgent", classified=count, inherited=inherited, **self.stats)
+        return {"status": "success", "classified": count, "inherited": inherited, **self.stats}
+
+    @staticmethod
+    def _pending() -> tuple:
+        return (
+            Article.domain == None,
+            Article.content_clean != None,
+            Article.is_valid == True,
+            Article.canonical_id == None,
+        )
+
+    @staticmethod
+    def _labelled() -> tuple:
+        # Training set: canonical articles the LLM labelled. Local predictions are never trained
+        # on (no self-reinforcing mistakes); NULL domain_source = labelled before it existed.
+        return (
+            Article.domain != None,
+            Article.content_clean != None,
+            Article.canonical_id == None,
+            or_(Article.domain_source == "llm", Article.domain_source == None),
+        )
+
+    async def _maybe_retrain(self):
+        """Retrains the local classifier once enough new LLM labels have accumulated (or it aged out)."""
+        try:
+            labelled = await self.db.scalar(select(func.count()).select_from(Article).where(*self._labelled()))
+            if not self.local.needs_training(labelled):
+                return
+            trainer = NaiveBayesTrainer(self.domains)
+            body = func.substr(Article.content_clean, 1, settings.DOMAIN_LOCAL_TEXT_CHARS).label("body")
+            # Keyset order over SHA256 ids is effectively a random sample when the cap kicks in
+            async for rows in iter_chunks(self.db, [Article.id, Article.title, body, Article.domain], *self._labelled()):
+                await asyncio.to_thread(
+                    trainer.add, [row.id for row in rows], [document(row.title, row.body) for row in rows], [row.domain for row in rows]
+                )
+                if trainer.samples >= settings.DOMAIN_LOCAL_MAX_SAMPLES:
+                    break
+            model = await asyncio.to_thread(trainer.build, labelled)
+            await asyncio.to_thread(self.local.install, model)
+        except Exception as e:
+            # The previous model (or the LLM alone) keeps working. Roll back so an aborted
+            # Postgres transaction doesn't fail the pending-articles scan that follows.
+            await self.db.rollback()
+            logger.error("domain_classifier_training_failed", error=str(e))
+
+    async def classify_ids(self, ids: Sequence[str]) -> int:
+        """Streaming entry point: classifies the given articles that still need a domain."""
+        res = await self.db.execute(select(Article.id, Article.title, Article.content_clean).where(
+            Article.id.in_(list(ids)), *self._pending()
+        ))
+        rows = res.all()
+        return await self._classify_rows(rows) if rows else 0
+
+    async def _classify_rows(self, rows) -> int:
+        # Confident local predictions are final; only the uncertain remainder (plus an audit
+        # sample) costs an LLM call
+        local, audits, rows = await self._classify_local(rows)
+
+        # Batches (or single articles) fan out concurrently; results merge back in order
+        if settings.DOMAIN_BATCH_ENABLED:
+            batches = self._pack(rows)
+            results = await self.executor.map(self._classify_batch, batches)
+        else:
+            batches = [[row] for row in rows]
+            results = await self.executor.map(self._classify_each, batches)
+
+        labels = {}
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                logger.error("classification_failed", ids=[row.id for row in batch], error=str(result))
+                continue
+            labels.update(result)
+
+        # Accuracy tracking: audited local predictions against the LLM's label
+        for article_id, predicted in audits.items():
+            if article_id in labels:
+                outcome = "audit_agree" if labels[article_id] == predicted else "audit_disagree"
+                self.stats[outcome] += 1
+                DOMAIN_LOCAL.labels(outcome=outcome).inc()
+        self.stats["llm"] += len(labels)
+        self.stats["local"] += len(local)
+
+        updates = [{"id": article_id, "domain": domain, "domain_source": "llm"} for article_id, domain in labels.items()]
+        updates += [{"id": article_id, "domain": domain, "domain_source": "local"} for article_id, domain in local.items()]
+
+        if updates:
+            await self.db.execute(update(Article), updates)
+        # Commit per chunk so paid-for classifications survive a crash
+        await self.db.commit()
+        return len(updates)
+
+    async def _classify_local(self, rows) -> tuple:
+        """Returns ({id: domain} accepted locally, {id: domain} audit sample, rows left for the LLM)."""
+        if not settings.DOMAIN_LOCAL_ENABLED or not self.local.ready or not rows:
+            return {}, {}, rows
+        predictions = await asyncio.to_thread(self.local.predict, [document(row.title, row.content_clean) for row in rows])
+
+        local, audits, remaining = {}, {}, []
+        for row, (domain, _) in zip(rows, predictions):
+            if domain is None:
+                remaining.append(row)
+            elif is_audited(row.id):
+                audits[row.id] = domain
+                remaining.append(row)
+            else:
+                local[row.id] = domain
+        DOMAIN_LOCAL.labels(outcome="accepted").inc(len(local))
+        DOMAIN_LOCAL.labels(outcome="deferred").inc(len(remaining) - len(audits))
+        return local, audits, remaining
+
+    async def _propagate_to_duplicates(self) -> int:
+        # Single set-based UPDATE: duplicates copy their canonical article's domain
+        canonical = aliased(Article)
+        canonical_domain = select(canonical.domain).where(canonical.id == Article.canonical_id).scalar_subquery()
         result = await self.db.execute(
-            select(Article).where(Article.domain == None, Article.content_clean != None, Article.is_valid == True)
+            update(Article)
+            .where(Article.canonical_id != None, Article.domain == None, canonical_domain != None)
+            .values(domain=canonical_domain, domain_source="inherited")
+            .execution_options(synchronize_session=False)
         )
-        articles = result.scalars().all()
-        
-        count = 0
-        for article in articles:
+        await self.db.commit()
+        return max(result.rowcount or 0, 0)
+
+    async def _classify_each(self, rows) -> dict:
+        labels = {}
+        for row in rows:
             try:
-                domain = await self._classify(article.title, article.content_clean)
-                article.domain = domain
-                count += 1
+                labels[row.id] = await self._classify(row.title, row.content_clean)
             except Exception as e:
-                logger.error("classification_failed", id=article.id, error=str(e))
+                logger.error("classification_failed", id=row.id, error=str(e))
                 # Don't invalidate, just skip classification for this run
                 continue
+        return labels
 
-        await self.db.commit()
-        logger.info("agent_complete", agent="DomainAgent", classified=count)
-        return {"status": "success", "classified": count}
+    def _pack(self, rows) -> list:
+        """Groups rows into batches bounded by DOMAIN_BATCH_SIZE and DOMAIN_BATCH_MAX_CHARS."""
+        batches, current, size = [], [], 0
+        for row in rows:
+            row_size = len(row.title or "") + min(len(row.content_clean or ""), settings.DOMAIN_SNIPPET_CHARS)
+            if current and (len(current) >= settings.DOMAIN_BATCH_SIZE or size + row_size > settings.DOMAIN_BATCH_MAX_CHARS):
+                batches.append(current)
+                current, size = [], 0
+            current.append(row)
+            size += row_size
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _classify_batch(self, rows) -> dict:
+        if len(rows) == 1:
+            return await self._classify_each(rows)
+
+        # Short positional ids (1..N) instead of 64-char SHA256s - cheaper and harder to garble
+        table = self.llm.optimizer.to_toon_table(
+            ["ID", "TITLE", "SNIPPET"],
+            [[i, row.title, (row.content_clean or "")[:settings.DOMAIN_SNIPPET_CHARS]] for i, row in enumerate(rows, 1)]
+        )
+        prompt = f"""
+        Classify each article into exactly one of: {', '.join(self.domains)}.
+        Return ONLY one line per article, in this exact format:
+        <ID> -> <category>
+        
+        ARTICLES:
+        {table}
+        """
+
+        labels = {}
+        try:
+            response = await self.llm.generate(prompt, system_instruction="You are a strict classifier.")
+            parsed = self._parse_batch(response, len(rows))
+            labels = {rows[i - 1].id: domain for i, domain in parsed.items()}
+        except Exception as e:
+            logger.error("batch_classification_failed", size=len(rows), error=str(e))
+
+        # Rule 9: Force clarity - anything missing or malformed is re-asked one by one
+        missing = [row for row in rows if row.id not in labels]
+        if missing:
+            logger.warning("batch_classification_incomplete", size=len(rows), missing=len(missing))
+            labels.update(await self._classify_each(missing))
+        return labels
+
+    def _parse_batch(self, response: str, size: int) -> dict:
+        """Strict parse of '<ID> -> <Domain>' lines. Unknown ids, unknown domains and duplicates are dropped."""
+        by_name = {d.lower(): d for d in self.domains}
+        parsed, conflicted = {}, set()
+        for line in response.split('\n'):
+            match = BATCH_LINE_RE.match(line.strip().strip('*`'))
+            if not match:
+                continue
+            idx = int(match.group(1))
+            domain = by_name.get(match.group(2).strip(' .*`"\'').lower())
+            if not 1 <= idx <= size or domain is None:
+                continue
+            if idx in parsed and parsed[idx] != domain:
+                # Contradicting answers for the same id - trust neither
+                conflicted.add(idx)
+            parsed[idx] = domain
+        return {idx: domain for idx, domain in parsed.items() if idx not in conflicted}
 
     async def _classify(self, title: str, text: str) -> str:
         # Rule 5: Deterministic logic
@@ -49,8 +260,8 @@ class DomainAgent:
         Text: {text[:300]}...
         """
         
-        # In a real ruthless implementation, I would batch these calls to save tokens (10 articles per prompt).
-        # For simplicity in this file, I'm doing 1:1, but will note the optimization chance.
+        # Single-article path: used when batching is disabled and as the fallback for
+        # ids a batch response missed (see _classify_batch).
         
         response = await self.llm.generate(prompt, system_instruction="You are a strict classifier.")
         cleaned_response = response.strip().title()
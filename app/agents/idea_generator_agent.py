@@ -9,7 +9,7 @@ logger = structlog.get_logger()
 class IdeaGeneratorAgent:
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.llm = LLMClient()
+        self.llm = LLMClient(agent_name="IdeaGeneratorAgent")
 
     async def run(self):
         logger.info("agent_start", agent="IdeaGeneratorAgent")
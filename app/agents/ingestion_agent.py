@@ -1,13 +1,15 @@
-import feedparser
 import hashlib
+from typing import Awaitable, Callable, List, Optional
 import yaml
 import structlog
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from app.db.models import Article
+from app.db.models import Article, FeedState
+from app.db.bulk import insert_ignore
 from app.config import get_settings
+from app.services.rss_fetcher import RSSFetcher
 
 logger = structlog.get_logger()
 settings = get_settings()
@@ -21,7 +23,8 @@ class IngestionAgent:
         # Using URL instead of content for ID to prevent re-ingestion of same link
         return hashlib.sha256(url.encode()).hexdigest()
 
-    async def run(self):
+    async def run(self, on_ingested: Optional[Callable[[List[str]], Awaitable[None]]] = None):
+        """`on_ingested` receives each feed's newly committed article ids (streaming mode)."""
         logger.info("agent_start", agent="IngestionAgent")
         
         # Load sources from YAML
@@ -32,24 +35,64 @@ class IngestionAgent:
             logger.error("sources_load_failed", path=settings.SOURCES_PATH, error=str(e))
             raise e # Rule 9: Force clarity, don't guess.
 
+        feeds = [(url, 'en') for url in sources.get('english', [])]
+        feeds += [(url, 'te') for url in sources.get('telugu', [])]
+
+        # Previous validators/hashes for conditional GET
+        states_res = await self.db.execute(select(FeedState).where(FeedState.url.in_([u for u, _ in feeds])))
+        states = {s.url: s for s in states_res.scalars().all()}
+        validators = {
+            url: {"etag": s.etag, "last_modified": s.last_modified, "content_hash": s.content_hash}
+            for url, s in states.items()
+        }
+
         ingested_count = 0
-        
-        # Process English
-        for url in sources.get('english', []):
-            ingested_count += await self._process_feed(url, 'en')
-            
-        # Process Telugu
-        for url in sources.get('telugu', []):
-            ingested_count += await self._process_feed(url, 'te')
+        unchanged_count = 0
 
-        logger.info("agent_complete", agent="IngestionAgent", new_articles=ingested_count)
-        return {"status": "success", "ingested": ingested_count}
+        # Fetch all feeds concurrently; DB writes stay sequential on our single session
+        # and start as soon as the first feed lands.
+        async with RSSFetcher() as fetcher:
+            async for result in fetcher.fetch_all(feeds, states=validators):
+                self._update_feed_state(states, result)
+                if result.not_modified:
+                    unchanged_count += 1
+                    continue
+                if not result.ok:
+                    continue
+                # Feed state is committed together with the feed's articles, so a failed
+                # write never leaves behind a hash that would skip those entries next run.
+                new_ids = await self._process_feed(result.url, result.language, result.feed)
+                ingested_count += len(new_ids)
+                if on_ingested and new_ids:
+                    await on_ingested(new_ids)
 
-    async def _process_feed(self, feed_url: str, language: str) -> int:
-        # Rule: Use custom User-Agent to match typical browser request (Ruthless Reliability)
-        logger.info("fetching_feed", url=feed_url)
-        feed = feedparser.parse(feed_url, agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-        
+        # Persist fetch bookkeeping for unchanged/failed feeds
+        await self.db.commit()
+
+        logger.info("agent_complete", agent="IngestionAgent", new_articles=ingested_count, unchanged_feeds=unchanged_count)
+        return {"status": "success", "ingested": ingested_count, "unchanged_feeds": unchanged_count}
+
+    def _update_feed_state(self, states: dict, result):
+        state = states.get(result.url)
+        if state is None:
+            state = FeedState(url=result.url)
+            states[result.url] = state
+            self.db.add(state)
+
+        now = datetime.utcnow()
+        state.last_status = result.status
+        state.last_fetched_at = now
+        if result.status == 200 and (result.ok or result.not_modified):
+            # Also when the body hash matched: a server may rotate its ETag for an unchanged
+            # body, and a stale If-None-Match would never get a 304 again. Not on errors, where
+            # new validators would turn the unprocessed body into a 304 next run.
+            state.etag = result.etag
+            state.last_modified = result.last_modified
+        if result.ok:
+            state.content_hash = result.content_hash
+            state.last_changed_at = now
+
+    async def _process_feed(self, feed_url: str, language: str, feed) -> List[str]:
         if hasattr(feed, 'bozo_exception') and feed.bozo_exception:
             logger.warning("feed_parse_warning", url=feed_url, error=str(feed.bozo_exception))
             # Some errors are non-critical, we check entries anyway
@@ -58,9 +101,9 @@ class IngestionAgent:
         logger.info("feed_received", url=feed_url, entries=entries_found)
         
         if entries_found == 0:
-            return 0
+            return []
 
-        count = 0
+        rows = {}
         for entry in feed.entries:
             try:
                 # Rule 9: Force Clarity - ensure critical fields exist
@@ -69,10 +112,7 @@ class IngestionAgent:
                     continue
 
                 article_id = self._generate_deterministic_id(entry.link)
-                
-                # Check for duplication (Rule 2: No shortcuts - check DB)
-                existing = await self.db.get(Article, article_id)
-                if existing:
+                if article_id in rows:
                     continue
 
                 # Rule 7: Store raw first
@@ -93,7 +133,7 @@ class IngestionAgent:
                 source_name = feed_url.split('/')[2] # naive domain extr
                 source_type = "gov" if "pib.gov" in feed_url or "nic.in" in feed_url else "independent"
 
-                new_article = Article(
+                rows[article_id] = dict(
                     id=article_id,
                     title=entry.title,
                     url=entry.link,
@@ -101,16 +141,27 @@ class IngestionAgent:
                     source=source_name,
                     source_type=source_type,
                     language=language,
-                    pub_date=pub_date
+                    pub_date=pub_date,
+                    ingested_at=datetime.utcnow(),
+                    is_valid=True
                 )
-                self.db.add(new_article)
-                count += 1
                 
             except Exception as e:
                 logger.error("article_ingest_failed", url=feed_url, error=str(e))
                 # Rule 11: Reject mediocrity - fail this item but continue report? 
                 # "Skip only that piece, never the entire report"
                 continue
-        
+
+        if not rows:
+            await self.db.commit()
+            return []
+
+        # Check for duplication (Rule 2: No shortcuts - check DB) in one round trip per feed
+        existing_res = await self.db.execute(select(Article.id).where(Article.id.in_(list(rows))))
+        for existing_id in existing_res.scalars().all():
+            rows.pop(existing_id, None)
+
+        # ON CONFLICT DO NOTHING covers rows inserted by an overlapping run since the check above
+        await insert_ignore(self.db, Article, list(rows.values()))
         await self.db.commit()
-        return count
+        return list(rows)
@@ -1,16 +1,31 @@
+import asyncio
+import hashlib
+import json
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 import structlog
 from datetime import datetime
+from app.config import get_settings
 from app.db.models import Article, Narrative
 from app.core.llm_client import LLMClient
+from app.core.concurrency import BoundedExecutor
+from app.core.metrics import record_cache
+from app.services.vector_store import HashingEmbedder, get_vector_store
 
 logger = structlog.get_logger()
+settings = get_settings()
+
+PLACEHOLDER_TEXT = "No summary generated."
+SYSTEM_INSTRUCTION = "You are a senior neutral intelligence analyst specializing in Indian discourse."
 
 class NarrativeAgent:
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.llm = LLMClient()
+        self.llm = LLMClient(agent_name="NarrativeAgent")
+        self.executor = BoundedExecutor()
+        self.embedder = HashingEmbedder()
+        self.store = get_vector_store()
 
     async def run(self):
         logger.info("agent_start", agent="NarrativeAgent")
@@ -24,7 +39,9 @@ class NarrativeAgent:
         domains_res = await self.db.execute(select(Article.domain).distinct().where(Article.domain != None))
         domains = domains_res.scalars().all()
 
-        count = 0
+        # Phase 1 (DB, sequential on our session): decide which domains need a narrative
+        work = []
+        unchanged = 0
         for domain in domains:
             try:
                 # Check if narrative already exists for this week/domain
@@ -34,53 +51,129 @@ class NarrativeAgent:
                     Narrative.year == year
                 ))
                 existing = existing_res.scalar()
-                
-                # Rule 5: Determinism - but if existing is a failure placeholder, re-run
-                if existing and existing.narrative_text != "No summary generated.":
-                    continue
 
-                # Get articles for this domain
-                arts_res = await self.db.execute(select(Article).where(
+                # Get recent candidate articles for this domain (slim columns, canonical copies only)
+                arts_res = await self.db.execute(select(
+                    Article.id, Article.source, Article.title, Article.content_clean, Article.content_hash
+                ).where(
                     Article.domain == domain,
-                    Article.is_valid == True
-                ).order_by(Article.pub_date.desc()).limit(20))
+                    Article.is_valid == True,
+                    Article.canonical_id == None
+                ).order_by(Article.pub_date.desc()).limit(settings.NARRATIVE_CANDIDATE_LIMIT))
                 
-                articles = arts_res.scalars().all()
-                if not articles:
+                candidates = arts_res.all()
+                if not candidates:
                     continue
+                articles = await self._select_relevant(candidates)
+                fingerprint = self._fingerprint(articles)
 
-                # Generate Narrative
-                narrative_text, sentiment = await self._generate_narrative(domain, articles)
-                
-                if existing:
-                    existing.narrative_text = narrative_text
-                    existing.sentiment = sentiment
-                else:
-                    new_narr = Narrative(
-                        domain=domain,
-                        week_number=week_num,
-                        year=year,
-                        narrative_text=narrative_text,
-                        sentiment=sentiment
-                    )
-                    self.db.add(new_narr)
-                count += 1
+                # Rule 5: Determinism - same inputs, same narrative. Placeholders always re-run.
+                has_narrative = existing is not None and existing.narrative_text != PLACEHOLDER_TEXT
+                if has_narrative and existing.input_fingerprint == fingerprint:
+                    unchanged += 1
+                    continue
+
+                delta = self._delta(existing, articles) if has_narrative else None
+                if delta is not None and not delta:
+                    # Only removals: the narrative already covers a superset of these inputs
+                    existing.input_fingerprint = fingerprint
+                    existing.input_article_ids = json.dumps(sorted(a.id for a in articles))
+                    unchanged += 1
+                    continue
+                work.append((domain, existing, articles, fingerprint, delta))
             except Exception as e:
                 logger.error("narrative_gen_failed", domain=domain, error=str(e))
+
+        # Phase 2 (network): generate every domain's narrative concurrently
+        results = await self.executor.map(self._generate_for, work)
+
+        # Phase 3 (DB): write results back in order
+        count = 0
+        for (domain, existing, articles, fingerprint, _), result in zip(work, results):
+            if isinstance(result, Exception):
+                logger.error("narrative_gen_failed", domain=domain, error=str(result))
+                continue
+            narrative_text, sentiment = result
+            input_ids = json.dumps(sorted(a.id for a in articles))
+            if narrative_text == PLACEHOLDER_TEXT:
+                # Don't fingerprint a failure - it must be retried next run
+                fingerprint = None
+            if existing:
+                existing.narrative_text = narrative_text
+                existing.sentiment = sentiment
+                existing.input_fingerprint = fingerprint
+                existing.input_article_ids = input_ids
+            else:
+                new_narr = Narrative(
+                    domain=domain,
+                    week_number=week_num,
+                    year=year,
+                    narrative_text=narrative_text,
+                    sentiment=sentiment,
+                    input_fingerprint=fingerprint,
+                    input_article_ids=input_ids
+                )
+                self.db.add(new_narr)
+            count += 1
         
         await self.db.commit()
-        logger.info("agent_complete", agent="NarrativeAgent", processed=count)
-        return {"status": "success", "narratives": count}
+        logger.info("agent_complete", agent="NarrativeAgent", processed=count, unchanged=unchanged)
+        return {"status": "success", "narratives": count, "unchanged": unchanged}
+
+    @staticmethod
+    def _fingerprint(articles) -> str:
+        material = "\n".join(sorted(f"{a.id}:{a.content_hash or ''}" for a in articles))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _delta(existing, articles):
+        """
+        New articles since the previous narrative, or None when a delta update isn't possible
+        (disabled, no recorded inputs, or nothing in common - then a full regeneration is cheaper).
+        """
+        if not settings.NARRATIVE_DELTA_UPDATES or not existing.input_article_ids:
+            return None
+        previous = set(json.loads(existing.input_article_ids))
+        fresh = [a for a in articles if a.id not in previous]
+        if len(fresh) == len(articles):
+            return None
+        if not fresh and {a.id for a in articles} == previous:
+            # Same articles, edited content - regenerate from scratch
+            return None
+        return fresh
+
+    async def _generate_for(self, item) -> tuple[str, str]:
+        domain, existing, articles, _, delta = item
+        if delta:
+            return await self._update_narrative(domain, existing, delta)
+        return await self._generate_narrative(domain, articles)
+
+    async def _select_relevant(self, rows) -> list:
+        """
+        Picks the NARRATIVE_ARTICLE_LIMIT articles closest to the domain's centroid - the most
+        representative coverage rather than simply the newest. Embeddings are cached in the vector store.
+        """
+        limit = settings.NARRATIVE_ARTICLE_LIMIT
+        if len(rows) <= limit:
+            return list(rows)
+
+        def rank():
+            missing = [r for r in rows if r.id not in self.store]
+            record_cache("embeddings", hits=len(rows) - len(missing), misses=len(missing))
+            if missing:
+                self.store.add([r.id for r in missing], self.embedder.embed([f"{r.title} {r.content_clean}" for r in missing]))
+            ids, matrix = self.store.get([r.id for r in rows])
+            centroid = matrix.mean(axis=0)
+            centroid /= (np.linalg.norm(centroid) or 1.0)
+            return self.store.search(centroid, k=limit, candidate_ids=ids)[0]
+
+        ranked = await asyncio.to_thread(rank)
+        by_id = {r.id: r for r in rows}
+        return [by_id[article_id] for article_id, _ in ranked]
 
     async def _generate_narrative(self, domain: str, articles: list) -> tuple[str, str]:
-        # Prepare data block
-        snippets = []
-        for a in articles:
-            # Rule 6: Token efficiency - only clean text
-            snippets.append(f"SOURCE:{a.source} | TITLE:{a.title} | CONTENT:{a.content_clean[:200]}")
-        data_block = "\n".join(snippets)
-
-        prompt = f"""
+        def prompt(data_block: str) -> str:
+            return f"""
         Analyze the following articles for the Indian media domain '{domain}'.
         1. Write a strict, neutral, factual summary (max 3 sentences).
         2. Identify the overall sentiment: Optimistic, Pessimistic, Neutral, or Critical.
@@ -93,10 +186,43 @@ class NarrativeAgent:
         {data_block}
         """
 
-        response = await self.llm.generate(prompt, system_instruction="You are a senior neutral intelligence analyst specializing in Indian discourse.")
+        response = await self.llm.generate(prompt(self._pack(articles, prompt(""))), system_instruction=SYSTEM_INSTRUCTION)
+        return self._parse_response(response)
+
+    async def _update_narrative(self, domain: str, existing, new_articles: list) -> tuple[str, str]:
+        # Delta prompt: previous summary + only the articles it hasn't seen
+        def prompt(data_block: str) -> str:
+            return f"""
+        Below is the current summary for the Indian media domain '{domain}', followed by NEW articles published since.
+        1. Update the summary so it reflects the new articles (strict, neutral, factual, max 3 sentences).
+        2. Identify the overall sentiment: Optimistic, Pessimistic, Neutral, or Critical.
+        
+        CRITICAL: Your response must follow this EXACT format:
+        SUMMARY: <your summary here>
+        SENTIMENT: <the sentiment here>
         
+        CURRENT SUMMARY ({existing.sentiment}):
+        {existing.narrative_text}
+        
+        NEW ARTICLES:
+        {data_block}
+        """
+
+        response = await self.llm.generate(prompt(self._pack(new_articles, prompt(""))), system_instruction=SYSTEM_INSTRUCTION)
+        return self._parse_response(response)
+
+    def _pack(self, articles: list, template: str) -> str:
+        # Rule 6: Token efficiency - clean text only, packed to NARRATIVE_PROMPT_TOKENS in
+        # priority order (most representative first, see _select_relevant)
+        optimizer = self.llm.optimizer
+        budget = optimizer.prompt_budget(settings.NARRATIVE_PROMPT_TOKENS, template, SYSTEM_INSTRUCTION)
+        items = [(f"SOURCE:{a.source} | TITLE:{a.title} | CONTENT:", a.content_clean or "") for a in articles]
+        return "\n".join(line for line in optimizer.pack(items, budget) if line is not None)
+
+    @staticmethod
+    def _parse_response(response: str) -> tuple[str, str]:
         # Robust parsing
-        summary = "No summary generated."
+        summary = PLACEHOLDER_TEXT
         sentiment = "Neutral"
         
         for line in response.split('\n'):
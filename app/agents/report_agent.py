@@ -1,89 +1,105 @@
+import asyncio
 import os
 from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Optional
 import structlog
 from supabase import create_client, Client
+from tenacity import AsyncRetrying, stop_after_attempt, wait_random_exponential
 from app.config import get_settings
+from app.services.report_renderer import CONTENT_TYPES, get_report_renderer
 
 logger = structlog.get_logger()
 settings = get_settings()
 
+
+@lru_cache()
+def get_supabase_client() -> Optional[Client]:
+    # Initialize Supabase Client if keys exist (once per process, not per report)
+    if not (settings.SUPABASE_URL and settings.SUPABASE_KEY):
+        return None
+    try:
+        return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+    except Exception as e:
+        logger.warning("supabase_init_failed", error=str(e))
+        return None
+
+
 class ReportAgent:
     def __init__(self):
         self.reports_dir = settings.REPORTS_DIR
-        if not os.path.exists(self.reports_dir):
-            os.makedirs(self.reports_dir)
-            
-        # Initialize Supabase Client if keys exist
-        self.supabase: Client = None
-        if settings.SUPABASE_URL and settings.SUPABASE_KEY:
-            try:
-                self.supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
-            except Exception as e:
-                logger.warning("supabase_init_failed", error=str(e))
+        self.renderer = get_report_renderer()
+        self.supabase: Client = get_supabase_client()
 
     async def run(self, narratives: list, conflicts: list, ideas: str, stats: dict):
         logger.info("agent_start", agent="ReportAgent")
-        
-        date_str = datetime.now().strftime("%Y-%m-%d")
-        week_num = datetime.now().isocalendar()[1]
-        
-        # Format Sections (Reuse logic or refactor - kept same for brevity)
-        conflict_section = "\n".join([str(c) for c in conflicts]) if conflicts else "No significant cross-source conflicts detected this week."
-        narrative_section = ""
-        for n in narratives:
-            narrative_section += f"### {n.domain}\n*   **Narrative:** {n.narrative_text}\n*   **Sentiment:** {n.sentiment}\n\n"
-
-        report_content = f"""# 🇮🇳 India Discourse Intelligence Report: Week {week_num}, {datetime.now().year}
-
-**Date:** {date_str}
-**Stats:** {stats}
-
----
 
-## 1. Executive Summary
-This week saw activity across {len(narratives)} domains.
+        now = datetime.now()
+        week_num = now.isocalendar()[1]
+        data = {
+            "week": week_num,
+            "year": now.year,
+            "date": now.strftime("%Y-%m-%d"),
+            "stats": stats,
+            "narratives": [
+                {"domain": n.domain, "narrative_text": n.narrative_text, "sentiment": n.sentiment}
+                for n in narratives
+            ],
+            "conflicts": [str(c) for c in conflicts or []],
+            "ideas": ideas,
+        }
 
----
+        # Rendering and file writes run off the event loop; one data dict feeds every format
+        rendered = await asyncio.to_thread(self.renderer.render, data)
+        basename = f"report_week_{week_num}"
+        paths = await asyncio.to_thread(self._write, basename, rendered)
 
-## 2. Domain-Wise Narratives
-{narrative_section}
-
----
-
-## 3. Cross-Source Validation
-> [!WARNING]
-> **Conflict Analysis**
-> {conflict_section}
-
----
+        # Upload from memory (no re-read), all formats concurrently, each with retries
+        cloud_urls = {}
+        if self.supabase:
+            results = await asyncio.gather(
+                *[self._upload(f"{basename}.{fmt}", body.encode("utf-8"), fmt, now.year) for fmt, body in rendered.items()],
+                return_exceptions=True,
+            )
+            for fmt, result in zip(rendered, results):
+                if isinstance(result, Exception):
+                    logger.error("supabase_upload_failed", format=fmt, error=str(result))
+                else:
+                    cloud_urls[fmt] = result
+            if cloud_urls:
+                logger.info("report_uploaded", urls=cloud_urls)
 
-## 4. Top 10 Actionable Ideas
-{ideas}
+        return {"status": "success", "path": paths["md"], "paths": paths, "cloud_url": cloud_urls.get("md"), "cloud_urls": cloud_urls}
 
----
-*System generated by India Discourse Intelligence (Cloud Optimized).*
-"""
-        
-        # 1. Save Local
-        filename = f"report_week_{week_num}.md"
-        filepath = os.path.join(self.reports_dir, filename)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(report_content)
-        
-        # 2. Upload to Supabase Phase
-        public_url = None
-        if self.supabase:
-            try:
-                with open(filepath, 'rb') as f:
-                    self.supabase.storage.from_(settings.SUPABASE_BUCKET).upload(
-                        path=f"reports/{datetime.now().year}/{filename}",
-                        file=f,
-                        file_options={"content-type": "text/markdown; charset=utf-8", "upsert": "true"}
-                    )
-                # Get Public URL (if bucket is public)
-                public_url = self.supabase.storage.from_(settings.SUPABASE_BUCKET).get_public_url(f"reports/{datetime.now().year}/{filename}")
-                logger.info("report_uploaded", url=public_url)
-            except Exception as e:
-                logger.error("supabase_upload_failed", error=str(e))
+    def _write(self, basename: str, rendered: Dict[str, str]) -> Dict[str, str]:
+        # Temp file + rename: readers never see a half-written report
+        os.makedirs(self.reports_dir, exist_ok=True)
+        paths = {}
+        for fmt, body in rendered.items():
+            path = os.path.join(self.reports_dir, f"{basename}.{fmt}")
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(body)
+            os.replace(tmp, path)
+            paths[fmt] = path
+        return paths
 
-        return {"status": "success", "path": filepath, "cloud_url": public_url}
+    async def _upload(self, filename: str, body: bytes, fmt: str, year: int) -> str:
+        # The storage client is synchronous - keep it in a worker thread so a slow upload
+        # never blocks the event loop (and with it the API)
+        bucket = self.supabase.storage.from_(settings.SUPABASE_BUCKET)
+        path = f"reports/{year}/{filename}"
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(settings.REPORT_UPLOAD_RETRIES + 1),
+            wait=wait_random_exponential(multiplier=settings.REPORT_UPLOAD_BACKOFF_SECONDS, max=30),
+            reraise=True,
+        ):
+            with attempt:
+                await asyncio.to_thread(
+                    bucket.upload,
+                    path=path,
+                    file=body,
+                    file_options={"content-type": CONTENT_TYPES[fmt], "upsert": "true"},
+                )
+        # Get Public URL (if bucket is public)
+        return await asyncio.to_thread(bucket.get_public_url, path)
@@ -1,68 +1,140 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 import structlog
+from app.config import get_settings
 from app.db.models import Article
 from app.core.llm_client import LLMClient
+from app.core.concurrency import BoundedExecutor
+from app.services.story_matcher import match_stories
 
 logger = structlog.get_logger()
+settings = get_settings()
+
+SYSTEM_INSTRUCTION = "You are a strict fact-checker."
 
 class ValidationAgent:
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.llm = LLMClient()
+        self.llm = LLMClient(agent_name="ValidationAgent")
+        self.executor = BoundedExecutor()
 
     async def run(self):
         logger.info("agent_start", agent="ValidationAgent")
         
-        # We need topics covered by BOTH Gov and Independent sources to find conflicts
-        # This is expensive. We will sample top 5 keywords from Gov articles and see if Indep covers them.
-        
-        # 1. Get Gov Articles
-        gov_res = await self.db.execute(select(Article).where(Article.source_type == 'gov').limit(10))
-        gov_arts = gov_res.scalars().all()
+        # We need topics covered by BOTH Gov and Independent sources to find conflicts.
+        # Pre-match on the week's articles locally, then only send matched stories to the LLM.
         
-        # 2. Get Indep Articles
-        ind_res = await self.db.execute(select(Article).where(Article.source_type == 'independent').limit(20))
-        ind_arts = ind_res.scalars().all()
+        # 1. Get this week's Gov / Indep Articles (slim columns, canonical copies only)
+        gov_arts = await self._recent('gov')
+        ind_arts = await self._recent('independent')
         
         if not gov_arts or not ind_arts:
             logger.info("validation_skip", reason="Insufficient cross-source data")
             return {"status": "skipped"}
 
-        # Naive matching: Compare checking titles/topics (Using LLM for smart matching)
+        # 2. Pair articles on the same story (TF-IDF cosine, English + Telugu).
+        # Hashing + matmul over thousands of texts - off the event loop.
+        clusters = await asyncio.to_thread(match_stories, gov_arts, ind_arts)
+        if not clusters:
+            logger.info("validation_skip", reason="No overlapping stories", gov=len(gov_arts), independent=len(ind_arts))
+            return {"status": "success", "conflicts": [], "matched_stories": 0}
+
+        # 3. Small batches of matched clusters, checked in parallel
+        size = settings.VALIDATION_CLUSTERS_PER_PROMPT
+        batches = [clusters[i:i + size] for i in range(0, len(clusters), size)]
+        results = await self.executor.map(self._check_batch, batches)
+
         discrepancies = []
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("validation_failed", error=str(result))
+                continue
+            discrepancies.extend(result)
+
+        # We don't have a specific DB table for Conflicts in the initial plan (Narrative fits, or just log/Report)
+        # I will return them to be included in the report generation phase dynamically or logged
+        # Rule 1: No ambiguity - I will store them in a simple Global/Shared state or return them. 
+        # Since Agents pipeline is sequential, I can return them.
         
-        # Batch analysis for conflicts
-        prompt = f"""
-        Compare these GOVERNMENT articles with INDEPENDENT articles.
+        logger.info("agent_complete", agent="ValidationAgent", matched_stories=len(clusters), conflicts_found=len(discrepancies))
+        return {"status": "success", "conflicts": discrepancies, "matched_stories": len(clusters)}
+
+    async def _recent(self, source_type: str) -> list:
+        since = datetime.utcnow() - timedelta(days=settings.VALIDATION_WINDOW_DAYS)
+        res = await self.db.execute(select(
+            Article.id, Article.title, Article.content_clean, Article.language
+        ).where(
+            Article.source_type == source_type,
+            Article.pub_date >= since,
+            Article.content_clean != None,
+            Article.is_valid == True,
+            Article.canonical_id == None
+        ).order_by(Article.pub_date.desc()).limit(settings.VALIDATION_MAX_ARTICLES))
+        return res.all()
+
+    async def _check_batch(self, clusters) -> list:
+        def prompt(stories_block: str) -> str:
+            return f"""
+        Each STORY below pairs a GOVERNMENT article with INDEPENDENT articles on the same topic.
         Identify any specific factual discrepancies or significant tone contrast (e.g. Govt says "Success", Media says "Failure").
         
-        Return ONLY valid conflicts in this format:
+        Return ONLY valid conflicts, one per line, in this format:
         CONFLICT: [Topic] | GOVT: [Claim] | INDEP: [Claim] | VERDICT: [Analysis]
         
         If no conflict, return "NO_CONFLICT".
         
-        GOVERNMENT SOURCES:
-        {self._fmt(gov_arts)}
-        
-        INDEPENDENT SOURCES:
-        {self._fmt(ind_arts)}
+        {stories_block}
         """
-        
-        try:
-            response = await self.llm.generate(prompt, system_instruction="You are a strict fact-checker.")
-            if "NO_CONFLICT" not in response:
-                discrepancies.append(response)
-        except Exception as e:
-            logger.error("validation_failed", error=str(e))
 
-        # We don't have a specific DB table for Conflicts in the initial plan (Narrative fits, or just log/Report)
-        # I will return them to be included in the report generation phase dynamically or logged
-        # Rule 1: No ambiguity - I will store them in a simple Global/Shared state or return them. 
-        # Since Agents pipeline is sequential, I can return them.
-        
-        logger.info("agent_complete", agent="ValidationAgent", conflicts_found=len(discrepancies))
-        return {"status": "success", "conflicts": discrepancies}
+        scaffold = self._stories(clusters, None)
+        budget = self.llm.optimizer.prompt_budget(settings.VALIDATION_PROMPT_TOKENS, prompt(scaffold), SYSTEM_INSTRUCTION)
+        stories_block = self._stories(clusters, self._pack(clusters, budget))
+        if not stories_block:
+            logger.warning("validation_budget_exhausted", clusters=len(clusters), budget=budget)
+            return []
+
+        response = await self.llm.generate(prompt(stories_block), system_instruction=SYSTEM_INSTRUCTION)
+        if "NO_CONFLICT" in response and "CONFLICT:" not in response.replace("NO_CONFLICT", ""):
+            return []
+        conflicts = [line.strip() for line in response.split('\n') if line.strip().upper().startswith("CONFLICT:")]
+        # Unstructured answer: keep it whole rather than silently dropping it
+        return conflicts or [response.strip()]
+
+    def _pack(self, clusters, budget: int) -> dict:
+        """
+        {(story, position): "- title: excerpt"}, packed to `budget` tokens. Position 0 is the
+        government article. Priority goes round-robin across stories - every government article,
+        then every story's first independent match, and so on - so a tight budget thins the
+        matches instead of dropping whole stories.
+        """
+        keys, items = [], []
+        for position in range(max(len(independents) for _, independents in clusters) + 1):
+            for n, (gov, independents) in enumerate(clusters, 1):
+                if position == 0:
+                    article = gov
+                elif position <= len(independents):
+                    article = independents[position - 1]
+                else:
+                    continue
+                keys.append((n, position))
+                items.append((f"- {article.title}:", article.content_clean or ""))
+        packed = self.llm.optimizer.pack(items, budget)
+        return {key: line for key, line in zip(keys, packed) if line is not None}
 
-    def _fmt(self, articles):
-        return "\n".join([f"- {a.title}: {a.content_clean[:50]}..." for a in articles])
+    @staticmethod
+    def _stories(clusters, packed: Optional[dict]) -> str:
+        # packed=None renders the bare scaffold, which prompt_budget charges as template
+        stories = []
+        for n, (_, independents) in enumerate(clusters, 1):
+            lines = packed or {}
+            independent_lines = [lines[(n, p)] for p in range(1, len(independents) + 1) if (n, p) in lines]
+            if packed is not None and ((n, 0) not in lines or not independent_lines):
+                # Nothing to compare without both sides
+                continue
+            government = lines.get((n, 0), "")
+            independent = "\n".join(independent_lines)
+            stories.append(f"STORY {n}\nGOVERNMENT:\n{government}\nINDEPENDENT:\n{independent}")
+        return "\n\n".join(stories)
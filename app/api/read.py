@@ -0,0 +1,199 @@
+import asyncio
+import base64
+import glob
+import json
+import os
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import and_, or_
+from sqlalchemy.future import select
+
+from app.config import get_settings
+from app.core.read_cache import CachedResponse, get_read_cache
+from app.db.models import Article, Narrative
+from app.db.session import AsyncSessionLocal
+from app.services.report_renderer import CONTENT_TYPES
+
+settings = get_settings()
+
+# Read-only dashboard API. Every response is served from the ReadCache with an ETag;
+# the DB (or disk) is only touched on a miss.
+router = APIRouter(prefix=settings.API_V1_STR, tags=["read"])
+
+
+class NarrativeOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    domain: str
+    week_number: int
+    year: int
+    narrative_text: str
+    sentiment: str
+    created_at: datetime
+
+
+class NarrativePage(BaseModel):
+    items: List[NarrativeOut]
+    next_cursor: Optional[str] = None
+
+
+class ArticleOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    title: str
+    url: str
+    source: str
+    source_type: str
+    language: str
+    domain: Optional[str] = None
+    pub_date: datetime
+
+
+class ArticlePage(BaseModel):
+    items: List[ArticleOut]
+    next_cursor: Optional[str] = None
+
+
+def _encode_cursor(values: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> dict:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    # If-None-Match: "*", or a list of (possibly weak) validators; weak comparison per RFC 9110
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or etag in (c[2:] if c.startswith("W/") else c for c in candidates)
+
+
+def _respond(request: Request, cached: CachedResponse) -> Response:
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"} # Always revalidate; 304s are cheap
+    if _etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type=cached.media_type, headers=headers)
+
+
+@router.get("/narratives", response_model=NarrativePage)
+async def list_narratives(
+    request: Request,
+    week: Optional[int] = Query(None, ge=1, le=53, description="ISO week; defaults to the current week"),
+    year: Optional[int] = Query(None, ge=2000),
+    domain: Optional[str] = None,
+    limit: int = Query(settings.READ_API_DEFAULT_LIMIT, ge=1, le=settings.READ_API_MAX_LIMIT),
+    cursor: Optional[str] = None,
+):
+    # Same week/year convention as NarrativeAgent (ISO week, calendar year)
+    now = datetime.now()
+    week, year = week or now.isocalendar()[1], year or now.year
+    after = _decode_cursor(cursor).get("id") if cursor else None
+    if after is not None and not isinstance(after, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    async def load() -> CachedResponse:
+        stmt = select(
+            Narrative.id, Narrative.domain, Narrative.week_number, Narrative.year,
+            Narrative.narrative_text, Narrative.sentiment, Narrative.created_at,
+        ).where(Narrative.week_number == week, Narrative.year == year)
+        if domain:
+            stmt = stmt.where(Narrative.domain == domain)
+        if after is not None:
+            stmt = stmt.where(Narrative.id > after)
+        # One extra row tells us whether there's a next page without a COUNT
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(stmt.order_by(Narrative.id).limit(limit + 1))).all()
+        page = NarrativePage(
+            items=[NarrativeOut.model_validate(row) for row in rows[:limit]],
+            next_cursor=_encode_cursor({"id": rows[limit - 1].id}) if len(rows) > limit else None,
+        )
+        return CachedResponse.of(page.model_dump_json().encode("utf-8"))
+
+    cached = await get_read_cache().get_or_load(("narratives", week, year, domain, limit, after), load)
+    return _respond(request, cached)
+
+
+@router.get("/articles", response_model=ArticlePage)
+async def list_articles(
+    request: Request,
+    domain: Optional[str] = None,
+    source_type: Optional[Literal["gov", "independent"]] = None,
+    language: Optional[str] = None,
+    include_duplicates: bool = False,
+    limit: int = Query(settings.READ_API_DEFAULT_LIMIT, ge=1, le=settings.READ_API_MAX_LIMIT),
+    cursor: Optional[str] = None,
+):
+    """Newest first. Keyset on (pub_date, id), so deep pages cost the same as the first."""
+    after = None
+    if cursor:
+        values = _decode_cursor(cursor)
+        try:
+            after = (datetime.fromisoformat(values["pub_date"]), str(values["id"]))
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    async def load() -> CachedResponse:
+        # Filters line up with ix_articles_domain_valid_pubdate / ix_articles_source_type_pubdate
+        stmt = select(
+            Article.id, Article.title, Article.url, Article.source, Article.source_type,
+            Article.language, Article.domain, Article.pub_date,
+        ).where(Article.is_valid == True)
+        if domain:
+            stmt = stmt.where(Article.domain == domain)
+        if source_type:
+            stmt = stmt.where(Article.source_type == source_type)
+        if language:
+            stmt = stmt.where(Article.language == language)
+        if not include_duplicates:
+            stmt = stmt.where(Article.canonical_id == None)
+        if after is not None:
+            stmt = stmt.where(or_(
+                Article.pub_date < after[0],
+                and_(Article.pub_date == after[0], Article.id < after[1]),
+            ))
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(stmt.order_by(Article.pub_date.desc(), Article.id.desc()).limit(limit + 1))).all()
+        last = rows[limit - 1] if len(rows) > limit else None
+        page = ArticlePage(
+            items=[ArticleOut.model_validate(row) for row in rows[:limit]],
+            next_cursor=_encode_cursor({"pub_date": last.pub_date.isoformat(), "id": last.id}) if last else None,
+        )
+        return CachedResponse.of(page.model_dump_json().encode("utf-8"))
+
+    key = ("articles", domain, source_type, language, include_duplicates, limit, after)
+    cached = await get_read_cache().get_or_load(key, load)
+    return _respond(request, cached)
+
+
+def _latest_report(fmt: str) -> Optional[bytes]:
+    # Newest by mtime: week numbers restart every year
+    paths = glob.glob(os.path.join(settings.REPORTS_DIR, f"report_week_*.{fmt}"))
+    if not paths:
+        return None
+    with open(max(paths, key=os.path.getmtime), "rb") as f:
+        return f.read()
+
+
+@router.get("/reports/latest")
+async def latest_report(request: Request, format: Literal["md", "html", "json"] = "md"):
+    async def load() -> CachedResponse:
+        body = await asyncio.to_thread(_latest_report, format)
+        if body is None:
+            raise HTTPException(status_code=404, detail="No report generated yet")
+        return CachedResponse.of(body, CONTENT_TYPES[format])
+
+    cached = await get_read_cache().get_or_load(("report", format), load)
+    return _respond(request, cached)
@@ -11,11 +11,27 @@ class Settings(BaseSettings):
     # Text Generation / LLM
     OPENROUTER_API_KEY: str = os.getenv("OPENROUTER_API_KEY", "")
     LLM_MODEL: str = "mistralai/mistral-7b-instruct"
+    LLM_BASE_URL: str = "https://openrouter.ai/api/v1" # Any OpenRouter/OpenAI-compatible endpoint (e.g. the benchmark stub)
+    LLM_CONTEXT_WINDOW: int = 32768 # Tokens, for LLM_MODEL; packed prompts stay below this minus LLM_MAX_OUTPUT_TOKENS
+    LLM_MAX_OUTPUT_TOKENS: int = 1000 # Completion cap (prevents runaways)
     SITE_URL: str = os.getenv("SITE_URL", "http://localhost:8000")
     APP_NAME_HEADER: str = "India Discourse Intel"
     
     # Database (Supabase Postgres)
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./india_intel.db")
+    DB_CHUNK_SIZE: int = 1000 # Rows per keyset page in batch agents
+
+    # Engine profile: auto | pooled (direct Postgres) | pgbouncer (transaction pooler) | sqlite | null
+    DB_ENGINE_PROFILE: str = "auto"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800 # Seconds; below typical server/LB idle timeouts
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 256
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 65536
+    SQLITE_MMAP_SIZE: int = 268435456
     
     @property
     def ASYNC_DATABASE_URL(self) -> str:
@@ -42,10 +58,112 @@ class Settings(BaseSettings):
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
     SUPABASE_BUCKET: str = "reports"
 
+    # Reports
+    REPORT_UPLOAD_RETRIES: int = 3
+    REPORT_UPLOAD_BACKOFF_SECONDS: float = 1.0
+    REPORT_SECTION_CACHE_SIZE: int = 256 # Rendered domain sections kept between runs
+
     # Paths
     BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     SOURCES_PATH: str = os.path.join(BASE_DIR, "sources", "rss_sources.yaml")
     REPORTS_DIR: str = os.path.join(BASE_DIR, "reports")
+    DATA_DIR: str = os.path.join(BASE_DIR, "data")
+
+    # RSS Fetching
+    FEED_MAX_CONCURRENCY: int = 32
+    FEED_PER_HOST_CONCURRENCY: int = 4
+    FEED_TIMEOUT_SECONDS: float = 20.0
+    FEED_USER_AGENT: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+    # HTML Cleaning
+    CLEANING_WORKERS: int = 0 # 0 = one process per CPU core
+    CLEANING_BATCH_SIZE: int = 200
+
+    # LLM Transport
+    LLM_TIMEOUT_SECONDS: float = 120.0
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_MAX_RETRIES: int = 5
+    LLM_BACKOFF_BASE_SECONDS: float = 1.0
+    LLM_BACKOFF_MAX_SECONDS: float = 60.0
+    LLM_REQUESTS_PER_MINUTE: int = 60 # 0 disables
+    LLM_TOKENS_PER_MINUTE: int = 200000 # 0 disables
+    LLM_CONCURRENCY: int = 8 # Max in-flight LLM calls per agent fan-out
+
+    # Token Accounting
+    TOKEN_USAGE_FLUSH_SECONDS: float = 5.0
+    TOKEN_USAGE_BATCH_SIZE: int = 200
+
+    # LLM Response Cache
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: str = os.path.join(DATA_DIR, "llm_cache.sqlite3")
+    LLM_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    LLM_CACHE_MAX_ENTRIES: int = 50000
+
+    # Near-Duplicate Detection (MinHash + LSH)
+    DEDUP_ENABLED: bool = True
+    DEDUP_NUM_PERM: int = 128
+    DEDUP_LSH_BANDS: int = 16 # 16 bands x 8 rows -> candidate threshold ~0.7
+    DEDUP_SHINGLE_SIZE: int = 3 # Words per shingle
+    DEDUP_THRESHOLD: float = 0.8 # Estimated Jaccard to count as the same story
+
+    # Vector Store / Embeddings
+    VECTOR_STORE_DIR: str = os.path.join(DATA_DIR, "vectors")
+    EMBEDDING_DIM: int = 512
+    VECTOR_IVF_MIN_ROWS: int = 50000 # Below this, exact search is fast enough
+    VECTOR_IVF_LISTS: int = 0 # 0 = sqrt(rows)
+    VECTOR_IVF_PROBES: int = 8
+
+    # Domain Classification
+    DOMAIN_BATCH_ENABLED: bool = True
+    DOMAIN_BATCH_SIZE: int = 15 # Articles per classification prompt
+    DOMAIN_BATCH_MAX_CHARS: int = 6000 # Size cap for the packed article table
+    DOMAIN_SNIPPET_CHARS: int = 300
+
+    # Local Domain Classifier (hashed n-grams + naive Bayes, trained on LLM labels; confident
+    # predictions skip the LLM)
+    DOMAIN_LOCAL_ENABLED: bool = True
+    DOMAIN_LOCAL_MODEL_PATH: str = os.path.join(DATA_DIR, "domain_classifier.npz")
+    DOMAIN_LOCAL_FEATURES: int = 1 << 18 # Hashed feature buckets
+    DOMAIN_LOCAL_TEXT_CHARS: int = 2000 # Body prefix used as features (plus the title)
+    DOMAIN_LOCAL_MIN_SAMPLES: int = 500 # LLM-labelled articles needed before the first training
+    DOMAIN_LOCAL_MAX_SAMPLES: int = 50000 # Training cap per retrain
+    DOMAIN_LOCAL_TARGET_PRECISION: float = 0.95 # Threshold is calibrated on held-out LLM labels to reach this
+    DOMAIN_LOCAL_MIN_CONFIDENCE: float = 0.6 # Floor for the calibrated threshold
+    DOMAIN_LOCAL_RETRAIN_GROWTH: float = 0.2 # Retrain once the labelled set grew by this share...
+    DOMAIN_LOCAL_RETRAIN_HOURS: float = 24.0 # ...or the model is this old and there are new labels
+    DOMAIN_LOCAL_AUDIT_RATE: float = 0.05 # Share of confident predictions still sent to the LLM (accuracy tracking)
+
+    # Narratives
+    NARRATIVE_ARTICLE_LIMIT: int = 20 # Articles fed to each domain narrative
+    NARRATIVE_CANDIDATE_LIMIT: int = 200 # Recent articles ranked by similarity to pick those
+    NARRATIVE_DELTA_UPDATES: bool = True # Update an existing narrative from only the new articles
+    NARRATIVE_PROMPT_TOKENS: int = 3000 # Target prompt size; article excerpts are packed to fill it
+
+    # Cross-Source Validation
+    VALIDATION_WINDOW_DAYS: int = 7
+    VALIDATION_MAX_ARTICLES: int = 2000 # Per source type
+    VALIDATION_MATCH_THRESHOLD: float = 0.25 # TF-IDF cosine to treat two articles as one story
+    VALIDATION_MAX_MATCHES: int = 3 # Independent articles paired with each gov article
+    VALIDATION_CLUSTERS_PER_PROMPT: int = 4
+    VALIDATION_PROMPT_TOKENS: int = 2000 # Target prompt size per batch of clusters; excerpts are packed to fill it
+
+    # Pipeline
+    PIPELINE_STREAMING: bool = False # Ingestion -> cleaning -> dedup -> classification as one streamed stage
+    STREAM_QUEUE_DEPTH: int = 4 # Micro-batches buffered between two streamed stages (backpressure)
+    STREAM_BATCH_SIZE: int = 100 # Max article ids per micro-batch
+    PIPELINE_LOCK_KEY: int = 7320241 # Postgres advisory lock key for the single-flight guard
+    PIPELINE_LOCK_PATH: str = os.path.join(DATA_DIR, "pipeline.lock") # SQLite: flock file
+    PIPELINE_RESUME_ON_STARTUP: bool = False # Resume the latest interrupted run when the app boots
+
+    # Read API
+    READ_CACHE_TTL_SECONDS: float = 300.0 # Staleness bound for writes this process doesn't see; runs here invalidate at once
+    READ_CACHE_MAX_ENTRIES: int = 1024
+    READ_API_DEFAULT_LIMIT: int = 50
+    READ_API_MAX_LIMIT: int = 200
+
+    # Observability
+    METRICS_ENABLED: bool = True # Prometheus metrics at /metrics; off = no-op instrumentation
 
     # Rutheless Config
     STRICT_MODE: bool = True
@@ -0,0 +1,41 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class BoundedExecutor:
+    """
+    Runs an async function over many items with at most `limit` in flight.
+    - Results come back in input order.
+    - Per-item error isolation: a failing item yields its exception in place, the rest continue.
+    - A fixed pool of `limit` workers pulls from a shared index, so thousands of items don't
+      mean thousands of pending tasks.
+    The provider-side ceiling is still enforced by the LLM rate limiter; this only bounds fan-out.
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = max(1, limit or settings.LLM_CONCURRENCY)
+
+    async def map(self, func: Callable[[Any], Awaitable[Any]], items: Sequence[Any]) -> List[Any]:
+        results: List[Any] = [None] * len(items)
+        next_index = 0
+
+        async def worker():
+            nonlocal next_index
+            while next_index < len(items):
+                i = next_index
+                next_index += 1
+                try:
+                    results[i] = await func(items[i])
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    results[i] = e
+
+        workers = min(self.limit, len(items))
+        if workers:
+            await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+import structlog
+
+from app.config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+
+class LLMResponseCache:
+    """
+    Durable, content-addressed cache of LLM responses.
+    Key: SHA256 of (model, system instruction, optimized prompt, sampling params), so any change
+    to what is actually sent to the provider is a different entry.
+    Storage: a local SQLite file (WAL) independent of the main DB, accessed from a worker thread.
+    Eviction: entries older than the TTL are dropped on read and on sweeps; sweeps also trim the
+    least-recently-used rows once the table exceeds max_entries.
+    """
+
+    SWEEP_EVERY = 100  # writes between eviction sweeps
+
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @staticmethod
+    def make_key(model: str, system_instruction: str, prompt: str, params: Dict[str, Any]) -> str:
+        material = json.dumps([model, system_instruction, prompt, params], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, response TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access)")
+            self._conn = conn
+        return self._conn
+
+    def _get_sync(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            response, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.evictions += 1
+                self.misses += 1
+                return None
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return response
+
+    def _set_sync(self, key: str, response: str):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._writes += 1
+            if self._writes % self.SWEEP_EVERY == 0:
+                self._sweep(conn, now)
+
+    def _sweep(self, conn: sqlite3.Connection, now: float):
+        evicted = 0
+        if self.ttl_seconds:
+            evicted += conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+        (size,) = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        overflow = size - self.max_entries
+        if overflow > 0:
+            evicted += conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            ).rowcount
+        self.evictions += evicted
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            return await asyncio.to_thread(self._get_sync, key)
+        except sqlite3.Error as e:
+            # A broken cache must never break generation
+            logger.warning("llm_cache_read_failed", error=str(e))
+            return None
+
+    async def set(self, key: str, response: str):
+        try:
+            await asyncio.to_thread(self._set_sync, key, response)
+        except sqlite3.Error as e:
+            logger.warning("llm_cache_write_failed", error=str(e))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+@lru_cache()
+def get_llm_cache() -> LLMResponseCache:
+    # Process-wide: every agent's LLMClient shares the same store and counters
+    return LLMResponseCache(
+        path=settings.LLM_CACHE_PATH,
+        ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+        max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    )
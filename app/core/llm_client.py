@@ -1,18 +1,102 @@
+import asyncio
 import json
+import time
 import aiohttp
 import structlog
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 from app.config import get_settings
 from app.core.token_optimizer import TokenOptimizer
+from app.core.llm_cache import get_llm_cache
+from app.core.rate_limiter import get_rate_limiter
+from app.core.usage_recorder import get_usage_recorder
+from app.core.metrics import LLM_CALLS, LLM_REQUEST_SECONDS, LLM_TOKENS, record_cache
 
 logger = structlog.get_logger()
 settings = get_settings()
 
-class LLMClient:
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# One pooled keep-alive session per process (per event loop), shared by every LLMClient
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+class LLMError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class RetryableLLMError(LLMError):
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message, status)
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    # Retry-After is either delta-seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class _BackoffHonouringRetryAfter:
+    """Jittered exponential backoff, but never shorter than the server's Retry-After."""
+
     def __init__(self):
+        self._jitter = wait_random_exponential(
+            multiplier=settings.LLM_BACKOFF_BASE_SECONDS, max=settings.LLM_BACKOFF_MAX_SECONDS
+        )
+
+    def __call__(self, retry_state) -> float:
+        delay = self._jitter(retry_state)
+        exc = retry_state.outcome.exception() if retry_state.outcome else None
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+
+async def get_http_session() -> aiohttp.ClientSession:
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        timeout = aiohttp.ClientTimeout(
+            total=settings.LLM_TIMEOUT_SECONDS, connect=settings.LLM_CONNECT_TIMEOUT_SECONDS
+        )
+        connector = aiohttp.TCPConnector(limit=settings.LLM_MAX_CONNECTIONS, keepalive_timeout=60)
+        _session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        _session_loop = loop
+    return _session
+
+
+async def close_http_session():
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session, _session_loop = None, None
+
+
+class LLMClient:
+    def __init__(self, agent_name: str = "unknown"):
+        self.agent_name = agent_name # TokenUsage attribution
         self.optimizer = TokenOptimizer()
         self.api_key = settings.OPENROUTER_API_KEY
         self.model = settings.LLM_MODEL
-        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
+        self.base_url = f"{settings.LLM_BASE_URL.rstrip('/')}/chat/completions"
+        self.cache = get_llm_cache() if settings.LLM_CACHE_ENABLED else None
+        self.limiter = get_rate_limiter()
+        self.usage = get_usage_recorder()
         
         if not self.api_key:
             logger.warning("OpenRouter API Key Missing. LLM calls will fail or mock.")
@@ -20,6 +104,7 @@ class LLMClient:
     async def generate(self, prompt: str, system_instruction: str = "") -> str:
         if not self.api_key:
             if settings.DEBUG:
+                LLM_CALLS.labels(agent=self.agent_name, outcome="mock").inc()
                 return "MOCK_LLM_OUTPUT (OpenRouter Missing): Actionable Idea generated."
             raise ValueError("OPENROUTER_API_KEY not set")
 
@@ -32,37 +117,89 @@ class LLMClient:
             messages.append({"role": "system", "content": system_instruction})
         messages.append({"role": "user", "content": optimized_prompt})
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "HTTP-Referer": settings.SITE_URL,
-            "X-Title": settings.APP_NAME_HEADER,
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "model": self.model,
             "messages": messages,
             "temperature": 0.0, # Deterministic
             "top_p": 0.9,
-            "max_tokens": 1000 # Prevent runaways
+            "max_tokens": settings.LLM_MAX_OUTPUT_TOKENS
         }
 
+        # 2. Cache lookup - temperature 0 makes identical requests interchangeable
+        cache_key = None
+        if self.cache:
+            sampling = {k: v for k, v in payload.items() if k not in ("model", "messages")}
+            cache_key = self.cache.make_key(self.model, system_instruction, optimized_prompt, sampling)
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                logger.debug("llm_cache_hit", key=cache_key[:12])
+                record_cache("llm", hits=1)
+                LLM_CALLS.labels(agent=self.agent_name, outcome="cache_hit").inc()
+                return cached
+            record_cache("llm", misses=1)
+
+        # 3. Call with rate limiting + retries on 429/5xx/network errors
+        original_full = f"{system_instruction}\n\n{prompt}"
+        optimized_full = f"{system_instruction}\n\n{optimized_prompt}"
+        prompt_estimate = self.optimizer.estimate_tokens(optimized_full)
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.base_url, headers=headers, json=payload) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        content = data['choices'][0]['message']['content']
-                        # Report Savings
-                        original_full = f"{system_instruction}\n\n{prompt}"
-                        optimized_full = f"{system_instruction}\n\n{optimized_prompt}"
-                        self.optimizer.report_savings(original_full, optimized_full)
-                        return content
-                    else:
-                        error_text = await resp.text()
-                        logger.error("openrouter_error", status=resp.status, body=error_text)
-                        raise Exception(f"OpenRouter API Error: {resp.status} - {error_text}")
-                        
+            async for attempt in AsyncRetrying(
+                retry=retry_if_exception_type(RetryableLLMError),
+                wait=_BackoffHonouringRetryAfter(),
+                stop=stop_after_attempt(settings.LLM_MAX_RETRIES + 1),
+                reraise=True,
+            ):
+                with attempt:
+                    data = await self._post(payload, prompt_estimate)
         except Exception as e:
             logger.error("llm_generation_failed", error=str(e))
+            LLM_CALLS.labels(agent=self.agent_name, outcome="error").inc()
             raise e
+
+        content = data['choices'][0]['message']['content']
+        # Exact counts from OpenRouter's `usage` block when present, local estimate otherwise
+        usage = data.get('usage') or {}
+        prompt_tokens = usage.get('prompt_tokens') or prompt_estimate
+        completion_tokens = usage.get('completion_tokens') or self.optimizer.estimate_tokens(content)
+        # Charge real completion tokens against the tokens/min budget
+        self.limiter.record_completion(completion_tokens)
+        LLM_CALLS.labels(agent=self.agent_name, outcome="success").inc()
+        LLM_TOKENS.labels(agent=self.agent_name, kind="prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(agent=self.agent_name, kind="completion").inc(completion_tokens)
+
+        # Report Savings + persist accounting (queued, never blocks this call)
+        saved = self.optimizer.report_savings(original_full, optimized_full)
+        self.usage.record(self.agent_name, prompt_tokens, completion_tokens, saved)
+        if cache_key:
+            await self.cache.set(cache_key, content)
+        return content
+
+    async def _post(self, payload: dict, prompt_estimate: int) -> dict:
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "HTTP-Referer": settings.SITE_URL,
+            "X-Title": settings.APP_NAME_HEADER,
+            "Content-Type": "application/json"
+        }
+
+        await self.limiter.acquire(prompt_estimate)
+        session = await get_http_session()
+        # Timed after the limiter, so the histogram is provider latency, not our own throttling
+        started = time.perf_counter()
+        status = "network_error"
+        try:
+            async with session.post(self.base_url, headers=headers, json=payload) as resp:
+                status = str(resp.status)
+                if resp.status == 200:
+                    return await resp.json()
+
+                error_text = await resp.text()
+                logger.error("openrouter_error", status=resp.status, body=error_text[:500])
+                message = f"OpenRouter API Error: {resp.status} - {error_text}"
+                if resp.status in RETRYABLE_STATUSES:
+                    raise RetryableLLMError(message, resp.status, _parse_retry_after(resp.headers.get("Retry-After")))
+                raise LLMError(message, resp.status)
+        except (aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError, asyncio.TimeoutError) as e:
+            raise RetryableLLMError(f"OpenRouter connection error: {type(e).__name__}: {e}") from e
+        finally:
+            LLM_REQUEST_SECONDS.labels(agent=self.agent_name, status=status).observe(time.perf_counter() - started)
@@ -0,0 +1,168 @@
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import get_settings
+
+settings = get_settings()
+
+ENABLED = settings.METRICS_ENABLED
+
+# Statement verb for the DB timing label (SELECT, INSERT, ...); keeps label cardinality fixed
+_VERB_RE = re.compile(r'^\s*(\w+)')
+_VERBS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "CREATE", "ALTER", "PRAGMA", "BEGIN", "COMMIT", "ROLLBACK"}
+
+
+class _NoopMetric:
+    """Stands in for every metric when METRICS_ENABLED is off: one attribute lookup and a call."""
+
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def observe(self, value: float):
+        pass
+
+    def inc(self, value: float = 1):
+        pass
+
+
+if ENABLED:
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+
+    # Own registry: /metrics exposes exactly what the pipeline records
+    REGISTRY = CollectorRegistry()
+
+    STAGE_SECONDS = Histogram(
+        "pipeline_stage_duration_seconds", "Pipeline stage wall time", ["stage", "status"],
+        buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200), registry=REGISTRY,
+    )
+    STAGE_ITEMS = Counter(
+        "pipeline_stage_items_total", "Counts reported by stages (ingested, cleaned, classified, ...)", ["stage", "field"],
+        registry=REGISTRY,
+    )
+    STREAM_BATCH_SECONDS = Histogram(
+        "stream_batch_duration_seconds", "Streaming micro-batch processing time", ["worker", "status"],
+        buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120), registry=REGISTRY,
+    )
+    LLM_REQUEST_SECONDS = Histogram(
+        "llm_request_duration_seconds", "OpenRouter HTTP attempt latency", ["agent", "status"],
+        buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120), registry=REGISTRY,
+    )
+    LLM_CALLS = Counter(
+        "llm_calls_total", "LLMClient.generate outcomes", ["agent", "outcome"], registry=REGISTRY,
+    )
+    LLM_TOKENS = Counter(
+        "llm_tokens_total", "Tokens billed", ["agent", "kind"], registry=REGISTRY,
+    )
+    FEED_FETCH_SECONDS = Histogram(
+        "feed_fetch_duration_seconds", "RSS feed fetch latency", ["feed", "status"],
+        buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60), registry=REGISTRY,
+    )
+    DB_QUERY_SECONDS = Histogram(
+        "db_query_duration_seconds", "SQL statement execution time", ["verb"],
+        buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10), registry=REGISTRY,
+    )
+    DB_QUERY_ERRORS = Counter(
+        "db_query_errors_total", "SQL statements that raised", ["verb"], registry=REGISTRY,
+    )
+    CACHE_LOOKUPS = Counter(
+        "cache_lookups_total", "Cache lookups (hit ratio = hit / (hit + miss))", ["cache", "result"], registry=REGISTRY,
+    )
+    DOMAIN_LOCAL = Counter(
+        "domain_local_predictions_total", "Local domain classifier outcomes (accepted, deferred, audit_agree, audit_disagree)",
+        ["outcome"], registry=REGISTRY,
+    )
+else:
+    REGISTRY = None
+    STAGE_SECONDS = STAGE_ITEMS = STREAM_BATCH_SECONDS = _NoopMetric()
+    LLM_REQUEST_SECONDS = LLM_CALLS = LLM_TOKENS = _NoopMetric()
+    FEED_FETCH_SECONDS = DB_QUERY_SECONDS = DB_QUERY_ERRORS = CACHE_LOOKUPS = DOMAIN_LOCAL = _NoopMetric()
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Times a block into pipeline_stage_duration_seconds{stage, status}."""
+    if not ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    status = "success"
+    try:
+        yield
+    except BaseException:
+        status = "failed"
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage=stage, status=status).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def track_batch(worker: str):
+    if not ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    status = "success"
+    try:
+        yield
+    except BaseException:
+        status = "failed"
+        raise
+    finally:
+        STREAM_BATCH_SECONDS.labels(worker=worker, status=status).observe(time.perf_counter() - started)
+
+
+def record_stage_items(stage: str, output: Optional[Dict[str, Any]]):
+    # Throughput from the counts agents already return ({"ingested": 120, ...})
+    if not ENABLED or not output:
+        return
+    for field, value in output.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0:
+            STAGE_ITEMS.labels(stage=stage, field=field).inc(value)
+
+
+def record_cache(cache: str, hits: int = 0, misses: int = 0):
+    if not ENABLED:
+        return
+    if hits:
+        CACHE_LOOKUPS.labels(cache=cache, result="hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache=cache, result="miss").inc(misses)
+
+
+def _verb(statement: str) -> str:
+    match = _VERB_RE.match(statement or "")
+    verb = match.group(1).upper() if match else "OTHER"
+    return verb if verb in _VERBS else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    DB_QUERY_SECONDS.labels(verb=_verb(statement)).observe(time.perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+    DB_QUERY_ERRORS.labels(verb=_verb(exception_context.statement)).inc()
+
+
+def install_db_timing(sync_engine):
+    """Per-statement timing via cursor-execute events. Not installed at all when disabled."""
+    if not ENABLED:
+        return
+    from sqlalchemy import event
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def render() -> Tuple[bytes, str]:
+    """Prometheus text exposition of everything recorded so far."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
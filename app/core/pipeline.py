@@ -0,0 +1,282 @@
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import structlog
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.metrics import record_stage_items, track_stage
+from app.db.models import PipelineRun, StageRun
+from app.db.session import AsyncSessionLocal
+
+logger = structlog.get_logger()
+
+# A stage gets its own session plus the result dicts of its dependencies, keyed by stage name
+StageFunc = Callable[[AsyncSession, Dict[str, Dict[str, Any]]], Awaitable[Dict[str, Any]]]
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    func: StageFunc
+    deps: Tuple[str, ...] = ()
+
+
+class Pipeline:
+    """
+    Runs stages as a DAG.
+    - A stage starts as soon as all of its dependencies finished, so independent branches run
+      concurrently and wall-clock time follows the critical path.
+    - Each stage runs on its own AsyncSession (sessions are not safe to share between tasks).
+    - Every execution is recorded as a StageRun row: status, duration, JSON output, error.
+    - A failed stage marks everything downstream of it 'skipped'; unrelated branches continue.
+    - Partial runs: dependencies outside the selected subset are assumed done, and their
+      latest successful recorded output is handed to the stage instead.
+    - Runs are registered as PipelineRun rows; `resume` re-runs only the stages of a run that
+      have no successful StageRun yet, feeding the rest from their recorded outputs.
+    Callers hold a PipelineLock around run/resume; that is what makes `mark_interrupted` safe.
+    """
+
+    def __init__(self, stages: Sequence[Stage], session_factory=AsyncSessionLocal):
+        self.stages: Dict[str, Stage] = {s.name: s for s in stages}
+        self.session_factory = session_factory
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        for stage in self.stages.values():
+            unknown = [d for d in stage.deps if d not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s): {unknown}")
+        order, visiting, done = [], set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline has a dependency cycle through '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def select(self, names: Optional[Iterable[str]] = None, downstream: bool = False) -> List[str]:
+        """Stage names to run, in topological order. `downstream` adds everything depending on them."""
+        if names is None:
+            return list(self.order)
+        selected = set(names)
+        unknown = selected - set(self.stages)
+        if unknown:
+            raise ValueError(f"Unknown stage(s): {sorted(unknown)}")
+        if downstream:
+            for name in self.order:
+                if any(dep in selected for dep in self.stages[name].deps):
+                    selected.add(name)
+        return [name for name in self.order if name in selected]
+
+    async def run(
+        self,
+        names: Optional[Iterable[str]] = None,
+        downstream: bool = False,
+        run_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        selected = self.select(names, downstream)
+        run_id = run_id or uuid.uuid4().hex
+        async with self.session_factory() as session:
+            session.add(PipelineRun(id=run_id, status="running", stages=json.dumps(selected), started_at=datetime.utcnow()))
+            await session.commit()
+        return await self._execute(run_id, selected, completed={})
+
+    async def resume(self, run_id: str) -> Dict[str, Any]:
+        """Continues a failed or interrupted run from its checkpoints, under the same run_id."""
+        async with self.session_factory() as session:
+            run = await session.get(PipelineRun, run_id)
+            if run is None:
+                raise ValueError(f"Unknown run_id '{run_id}'")
+            if run.status in ("running", "success"):
+                raise ValueError(f"Run '{run_id}' is {run.status}, nothing to resume")
+            # Stages dropped from the pipeline since (e.g. streaming mode toggled) are ignored
+            selected = [name for name in self.order if name in json.loads(run.stages)]
+            run.status = "running"
+            run.attempts = (run.attempts or 1) + 1
+            run.finished_at = None
+            run.error = None
+            await session.commit()
+        completed = await self._checkpoints(run_id)
+        logger.info("pipeline_resume", run_id=run_id, checkpoints=sorted(completed))
+        return await self._execute(run_id, selected, completed)
+
+    async def _execute(self, run_id: str, selected: List[str], completed: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        logger.info("pipeline_start", run_id=run_id, stages=selected)
+
+        tasks: Dict[str, asyncio.Future] = {}
+        try:
+            for name in selected:
+                if name in completed:
+                    # Checkpointed: resolved up front with the recorded output
+                    tasks[name] = asyncio.get_running_loop().create_future()
+                    tasks[name].set_result(("success", None, completed[name]))
+                    continue
+                upstream = {dep: tasks[dep] for dep in self.stages[name].deps if dep in tasks}
+                tasks[name] = asyncio.create_task(self._run_stage(run_id, self.stages[name], upstream))
+            results = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+        except BaseException as e:
+            # Cancelled (shutdown) or crashed mid-run: leave it resumable
+            for task in tasks.values():
+                task.cancel()
+            await self._finish_run(run_id, "interrupted", error=repr(e))
+            raise
+
+        summary = {
+            name: {"status": status, "duration_seconds": duration, "output": output, "checkpoint": name in completed}
+            for name, (status, duration, output) in results.items()
+        }
+        failed = sorted(name for name, r in summary.items() if r["status"] != "success")
+        await self._finish_run(run_id, "failed" if failed else "success", error=f"Stages not successful: {failed}" if failed else None)
+        elapsed = round(time.perf_counter() - started, 3)
+        logger.info(
+            "pipeline_complete", run_id=run_id, elapsed=elapsed,
+            stage_seconds=round(sum(r["duration_seconds"] or 0 for r in summary.values()), 3),
+            statuses={name: r["status"] for name, r in summary.items()},
+        )
+        return {"run_id": run_id, "status": "failed" if failed else "success", "elapsed_seconds": elapsed, "stages": summary}
+
+    async def _run_stage(self, run_id: str, stage: Stage, upstream: Dict[str, asyncio.Task]):
+        """Never raises: returns (status, duration, output) so dependents can decide to skip."""
+        finished = dict(zip(upstream, await asyncio.gather(*upstream.values())))
+        failed = [dep for dep, (status, _, _) in finished.items() if status != "success"]
+        if failed:
+            logger.warning("stage_skipped", run_id=run_id, stage=stage.name, failed_deps=failed)
+            await self._record(run_id, stage.name, status="skipped", error=f"Upstream not successful: {failed}")
+            return "skipped", None, None
+
+        inputs = {dep: output for dep, (_, _, output) in finished.items()}
+        for dep in stage.deps:
+            if dep not in inputs:
+                inputs[dep] = await self.last_output(dep)
+
+        row_id = await self._record(run_id, stage.name, status="running", started_at=datetime.utcnow())
+        logger.info("stage_start", run_id=run_id, stage=stage.name)
+        started = time.perf_counter()
+        try:
+            with track_stage(stage.name):
+                async with self.session_factory() as session:
+                    output = await stage.func(session, inputs) or {}
+        except Exception as e:
+            duration = round(time.perf_counter() - started, 3)
+            logger.error("stage_failed", run_id=run_id, stage=stage.name, duration=duration, error=str(e))
+            await self._finish(row_id, status="failed", duration=duration, error=str(e))
+            return "failed", duration, None
+
+        duration = round(time.perf_counter() - started, 3)
+        logger.info("stage_complete", run_id=run_id, stage=stage.name, duration=duration)
+        record_stage_items(stage.name, output)
+        await self._finish(row_id, status="success", duration=duration, output=output)
+        return "success", duration, output
+
+    # --- bookkeeping (short sessions of its own, independent of the stage's session) ---
+
+    async def _record(self, run_id: str, stage: str, **fields) -> int:
+        async with self.session_factory() as session:
+            row = StageRun(run_id=run_id, stage=stage, **fields)
+            session.add(row)
+            await session.commit()
+            return row.id
+
+    async def _finish(self, row_id: int, status: str, duration: float, output: Optional[Dict] = None, error: Optional[str] = None):
+        async with self.session_factory() as session:
+            await session.execute(update(StageRun).where(StageRun.id == row_id).values(
+                status=status,
+                finished_at=datetime.utcnow(),
+                duration_seconds=duration,
+                # default=str: agents may return datetimes or other non-JSON scalars
+                output=json.dumps(output, default=str) if output is not None else None,
+                error=error,
+            ))
+            await session.commit()
+
+    async def _finish_run(self, run_id: str, status: str, error: Optional[str] = None):
+        async with self.session_factory() as session:
+            await session.execute(update(PipelineRun).where(PipelineRun.id == run_id).values(
+                status=status, finished_at=datetime.utcnow(), error=error
+            ))
+            await session.commit()
+
+    async def _checkpoints(self, run_id: str) -> Dict[str, Dict[str, Any]]:
+        async with self.session_factory() as session:
+            res = await session.execute(select(StageRun.stage, StageRun.output).where(
+                StageRun.run_id == run_id,
+                StageRun.status == "success"
+            ))
+            return {stage: json.loads(output) if output else {} for stage, output in res.all()}
+
+    async def mark_interrupted(self) -> int:
+        """Flags runs/stages left 'running' by a dead process. Only call while holding the PipelineLock."""
+        async with self.session_factory() as session:
+            await session.execute(update(StageRun).where(StageRun.status == "running").values(status="interrupted"))
+            res = await session.execute(update(PipelineRun).where(PipelineRun.status == "running").values(status="interrupted"))
+            await session.commit()
+        if res.rowcount:
+            logger.warning("pipeline_runs_interrupted", runs=res.rowcount)
+        return max(res.rowcount or 0, 0)
+
+    async def latest_resumable(self, statuses: Sequence[str] = ("interrupted", "failed")) -> Optional[str]:
+        async with self.session_factory() as session:
+            res = await session.execute(select(PipelineRun.id).where(
+                PipelineRun.status.in_(list(statuses))
+            ).order_by(PipelineRun.started_at.desc()).limit(1))
+            return res.scalar()
+
+    async def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        async with self.session_factory() as session:
+            run = await session.get(PipelineRun, run_id)
+        if run is None:
+            return None
+        return {
+            "run_id": run.id,
+            "status": run.status,
+            "stages": json.loads(run.stages),
+            "attempts": run.attempts,
+            "started_at": run.started_at,
+            "finished_at": run.finished_at,
+            "error": run.error,
+            "stage_runs": await self.history(run_id),
+        }
+
+    async def last_output(self, stage: str) -> Dict[str, Any]:
+        async with self.session_factory() as session:
+            res = await session.execute(select(StageRun.output).where(
+                StageRun.stage == stage,
+                StageRun.status == "success"
+            ).order_by(StageRun.started_at.desc()).limit(1))
+            output = res.scalar()
+        return json.loads(output) if output else {}
+
+    async def history(self, run_id: str) -> List[Dict[str, Any]]:
+        async with self.session_factory() as session:
+            res = await session.execute(select(StageRun).where(StageRun.run_id == run_id).order_by(StageRun.id))
+            rows = res.scalars().all()
+        return [
+            {
+                "stage": r.stage,
+                "status": r.status,
+                "started_at": r.started_at,
+                "finished_at": r.finished_at,
+                "duration_seconds": r.duration_seconds,
+                "output": json.loads(r.output) if r.output else None,
+                "error": r.error,
+            }
+            for r in rows
+        ]
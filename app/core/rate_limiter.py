@@ -0,0 +1,82 @@
+import asyncio
+import time
+from functools import lru_cache
+from typing import Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at `rate_per_minute`.
+    acquire(n) waits until n units are available; consume(n) debits without waiting
+    (used to charge completion tokens once the real count is known - the bucket may go negative).
+    A rate of 0 disables the bucket.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _get_lock(self) -> asyncio.Lock:
+        # The bucket outlives any one event loop (get_rate_limiter is process-wide), but a lock
+        # that has been waited on is bound to its loop - make a fresh one per loop
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        if not self.enabled:
+            return
+        # A single request bigger than the whole bucket waits for a full bucket instead of forever
+        amount = min(amount, self.capacity)
+        async with self._get_lock():
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+
+    def consume(self, amount: float):
+        if not self.enabled:
+            return
+        self._refill()
+        self._tokens -= amount
+
+
+class RateLimiter:
+    """Requests/min + tokens/min limiter shared by every LLM call in the process."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    async def acquire(self, prompt_tokens: int):
+        await self.requests.acquire(1)
+        await self.tokens.acquire(prompt_tokens)
+
+    def record_completion(self, completion_tokens: int):
+        self.tokens.consume(completion_tokens)
+
+
+@lru_cache()
+def get_rate_limiter() -> RateLimiter:
+    return RateLimiter(settings.LLM_REQUESTS_PER_MINUTE, settings.LLM_TOKENS_PER_MINUTE)
@@ -0,0 +1,92 @@
+import asyncio
+import functools
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+from app.config import get_settings
+from app.core.metrics import record_cache
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A serialized response body plus its strong ETag (SHA256 of the body)."""
+    body: bytes
+    etag: str
+    media_type: str
+
+    @classmethod
+    def of(cls, body: bytes, media_type: str = "application/json") -> "CachedResponse":
+        return cls(body, f'"{hashlib.sha256(body).hexdigest()[:32]}"', media_type)
+
+
+@dataclass(frozen=True)
+class _Entry:
+    expires: float
+    value: CachedResponse
+
+
+class ReadCache:
+    """
+    In-process TTL + LRU cache of serialized read-API responses.
+    - Bodies are serialized once per fill, so a hit is a dict lookup - no DB, no pydantic.
+    - Concurrent misses for the same key share one load (single flight), so a burst of
+      dashboard requests after an invalidation costs one query, not hundreds.
+    - invalidate() (called when a pipeline run finishes) drops everything; loads that started
+      before it are served to their waiters but not stored. The TTL bounds staleness for
+      writes this process doesn't see (another worker's run).
+    Event-loop confined: use from async code on a single loop.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries or settings.READ_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.READ_CACHE_TTL_SECONDS
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.generation = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[CachedResponse]]) -> CachedResponse:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires > time.monotonic():
+            self._entries.move_to_end(key)
+            record_cache("read_api", hits=1)
+            return entry.value
+
+        task = self._inflight.get(key)
+        if task is None:
+            record_cache("read_api", misses=1)
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._store, key, self.generation))
+        else:
+            record_cache("read_api", hits=1)
+        # Shielded: a client disconnecting mid-load doesn't cancel the load for everyone else
+        return await asyncio.shield(task)
+
+    def _store(self, key: Hashable, generation: int, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled() or task.exception() is not None or generation != self.generation:
+            return
+        self._entries[key] = _Entry(time.monotonic() + self.ttl_seconds, task.result())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self):
+        self.generation += 1
+        self._entries.clear()
+        self._inflight.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "inflight": len(self._inflight), "generation": self.generation}
+
+
+@lru_cache()
+def get_read_cache() -> ReadCache:
+    return ReadCache()
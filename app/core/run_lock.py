@@ -0,0 +1,79 @@
+import fcntl
+import os
+from typing import Optional
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import get_settings
+from app.db.session import engine
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+
+class PipelineLock:
+    """
+    Single-flight guard: at most one pipeline run at a time, across processes and hosts.
+    - Postgres: pg_try_advisory_xact_lock inside a transaction held open on a dedicated connection.
+      Transaction-scoped (not session-scoped) so it also holds behind a transaction pooler
+      (PgBouncer/Supavisor pin the backend for the transaction). The server drops it if the
+      connection dies.
+    - SQLite: exclusive flock on PIPELINE_LOCK_PATH. The OS drops it if the process dies.
+    Because a dead holder always loses the lock, any run still marked 'running' while we hold
+    it was interrupted.
+    """
+
+    def __init__(self):
+        self._conn: Optional[AsyncConnection] = None
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._conn is not None or self._fd is not None
+
+    async def acquire(self) -> bool:
+        """Non-blocking. Returns False if another run holds the lock."""
+        if self.held:
+            return True
+        if engine.dialect.name == "postgresql":
+            conn = await engine.connect()
+            try:
+                await conn.begin()
+                res = await conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": settings.PIPELINE_LOCK_KEY})
+                acquired = bool(res.scalar())
+            except Exception:
+                await conn.close()
+                raise
+            if not acquired:
+                await conn.close()
+                return False
+            self._conn = conn
+        else:
+            os.makedirs(os.path.dirname(settings.PIPELINE_LOCK_PATH), exist_ok=True)
+            fd = os.open(settings.PIPELINE_LOCK_PATH, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+            self._fd = fd
+        logger.info("pipeline_lock_acquired", backend=engine.dialect.name)
+        return True
+
+    async def release(self):
+        if not self.held:
+            return
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            try:
+                # Ending the transaction releases the xact-scoped advisory lock
+                await conn.rollback()
+            finally:
+                await conn.close()
+        if self._fd is not None:
+            fd, self._fd = self._fd, None
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        logger.info("pipeline_lock_released")
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from typing import AsyncIterator, List, Optional
+
+import structlog
+
+from app.config import get_settings
+from app.core.metrics import track_batch
+from app.db.session import AsyncSessionLocal
+from app.agents.ingestion_agent import IngestionAgent
+from app.agents.cleaning_agent import CleaningAgent
+from app.agents.dedup_agent import DeduplicationAgent
+from app.agents.domain_agent import DomainAgent
+from app.services.html_cleaner import CleaningEngine
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+# End-of-stream marker, forwarded down the chain once a producer is done
+_END = object()
+
+
+class StreamingPipeline:
+    """
+    Ingestion -> cleaning -> dedup -> classification as concurrent workers connected by bounded
+    queues of article-id micro-batches, so HTML cleaning overlaps feed fetching and LLM
+    classification starts with the first feed instead of after the whole corpus.
+    - Backpressure: a full queue blocks its producer, so memory is bounded by
+      STREAM_QUEUE_DEPTH x STREAM_BATCH_SIZE ids per link, whatever the backlog.
+    - Each worker owns its AsyncSession and commits per micro-batch.
+    - A failing micro-batch is logged and dropped; a failing worker cancels the stream.
+    - Afterwards the regular chunked passes sweep up whatever the stream didn't cover
+      (backlog from earlier runs, dropped micro-batches) and propagate domains to duplicates.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, depth: Optional[int] = None, batch_size: Optional[int] = None):
+        self.session_factory = session_factory
+        self.depth = depth or settings.STREAM_QUEUE_DEPTH
+        self.batch_size = batch_size or settings.STREAM_BATCH_SIZE
+        self.stats = {}
+        self._started = 0.0
+
+    async def run(self) -> dict:
+        logger.info("agent_start", agent="StreamingPipeline", depth=self.depth, batch_size=self.batch_size)
+        self._started = time.perf_counter()
+        self.stats = {"ingested": 0, "unchanged_feeds": 0, "cleaned": 0, "duplicates": 0, "classified": 0, "first_classified_seconds": None}
+
+        to_clean, to_dedup, to_classify = (asyncio.Queue(maxsize=self.depth) for _ in range(3))
+        tasks = [
+            asyncio.create_task(self._ingest(to_clean)),
+            asyncio.create_task(self._clean(to_clean, to_dedup)),
+            asyncio.create_task(self._dedup(to_dedup, to_classify)),
+            asyncio.create_task(self._classify(to_classify)),
+        ]
+        # Fail fast: a dead worker would otherwise leave its producer blocked on a full queue
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for task in done:
+            if task.exception():
+                raise task.exception()
+        streamed = round(time.perf_counter() - self._started, 3)
+
+        swept = await self._sweep()
+        logger.info("agent_complete", agent="StreamingPipeline", streamed_seconds=streamed, swept=swept, **self.stats)
+        return {"status": "success", **self.stats, "swept": swept, "streamed_seconds": streamed}
+
+    async def _batches(self, queue: asyncio.Queue) -> AsyncIterator[List[str]]:
+        """Yields micro-batches until the end marker. A consumer that fell behind takes everything
+        already queued (up to about batch_size ids) in one go, so LLM prompts stay well packed."""
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            batch = list(item)
+            while len(batch) < self.batch_size and not queue.empty():
+                item = queue.get_nowait()
+                if item is _END:
+                    yield batch
+                    return
+                batch.extend(item)
+            yield batch
+
+    async def _ingest(self, out: asyncio.Queue):
+        async def emit(ids: List[str]):
+            for i in range(0, len(ids), self.batch_size):
+                await out.put(ids[i:i + self.batch_size])
+
+        async with self.session_factory() as db:
+            result = await IngestionAgent(db).run(on_ingested=emit)
+        self.stats["ingested"] = result.get("ingested", 0)
+        self.stats["unchanged_feeds"] = result.get("unchanged_feeds", 0)
+        await out.put(_END)
+
+    async def _clean(self, inp: asyncio.Queue, out: asyncio.Queue):
+        async with self.session_factory() as db, CleaningEngine() as engine:
+            agent = CleaningAgent(db)
+            async for ids in self._batches(inp):
+                try:
+                    with track_batch("cleaning"):
+                        cleaned = await agent.clean_ids(engine, ids)
+                except Exception as e:
+                    await db.rollback()
+                    logger.error("stream_batch_failed", stage="cleaning", size=len(ids), error=str(e))
+                    continue
+                self.stats["cleaned"] += len(cleaned)
+                if cleaned:
+                    await out.put(cleaned)
+        await out.put(_END)
+
+    async def _dedup(self, inp: asyncio.Queue, out: asyncio.Queue):
+        async with self.session_factory() as db:
+            agent = DeduplicationAgent(db)
+            async for ids in self._batches(inp):
+                try:
+                    with track_batch("dedup"):
+                        canonical = await agent.dedup_ids(ids)
+                except Exception as e:
+                    await db.rollback()
+                    logger.error("stream_batch_failed", stage="dedup", size=len(ids), error=str(e))
+                    continue
+                self.stats["duplicates"] += len(ids) - len(canonical)
+                if canonical:
+                    await out.put(canonical)
+        await out.put(_END)
+
+    async def _classify(self, inp: asyncio.Queue):
+        async with self.session_factory() as db:
+            agent = DomainAgent(db)
+            async for ids in self._batches(inp):
+                try:
+                    with track_batch("classification"):
+                        classified = await agent.classify_ids(ids)
+                except Exception as e:
+                    await db.rollback()
+                    logger.error("stream_batch_failed", stage="classification", size=len(ids), error=str(e))
+                    continue
+                self.stats["classified"] += classified
+                if classified and self.stats["first_classified_seconds"] is None:
+                    self.stats["first_classified_seconds"] = round(time.perf_counter() - self._started, 3)
+                    logger.info("stream_first_classified", seconds=self.stats["first_classified_seconds"])
+
+    async def _sweep(self) -> dict:
+        # Index-backed scans of the work queues: near-free when the stream covered everything
+        swept = {}
+        async with self.session_factory() as db:
+            swept["cleaned"] = (await CleaningAgent(db).run()).get("cleaned", 0)
+        async with self.session_factory() as db:
+            swept["duplicates"] = (await DeduplicationAgent(db).run()).get("duplicates", 0)
+        async with self.session_factory() as db:
+            result = await DomainAgent(db).run()
+            swept["classified"] = result.get("classified", 0)
+            swept["inherited"] = result.get("inherited", 0)
+        return swept
@@ -1,10 +1,31 @@
 import re
 import json
+import math
 import hashlib
-from typing import Dict, Any, List
+from collections import Counter
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 import structlog
+from app.config import get_settings
 
 logger = structlog.get_logger()
+settings = get_settings()
+
+# Local token estimation (used when the provider doesn't return `usage`).
+# Indic scripts (Devanagari..Sinhala, incl. Telugu U+0C00-U+0C7F) are poorly covered by BPE
+# vocabularies and mostly fall back to byte pieces, so they cost far more than whitespace
+# splitting suggests; Latin words average ~4 chars per token.
+_TOKEN_PIECE_RE = re.compile(r'[\u0900-\u0DFF]+|[A-Za-z]+|\d+|[^\s\w]|\w+')
+_INDIC_RE = re.compile(r'[\u0900-\u0DFF]')
+INDIC_TOKENS_PER_CHAR = 2.0
+LATIN_CHARS_PER_TOKEN = 4
+DIGITS_PER_TOKEN = 3
+
+# Prompt packing. Sentences end at . ! ? or the danda, followed by whitespace.
+_SENTENCE_RE = re.compile(r'(?<=[.!?\u0964])\s+')
+_NON_WORD_RE = re.compile(r'\W+', re.UNICODE)
+BOILERPLATE_MIN_ITEMS = 3 # A sentence in this many items ("Follow us on ...", agency credits) is dropped everywhere
+MIN_ITEM_TOKENS = 24 # Smallest body worth sending; below it, lower-priority items are dropped instead
+ELLIPSIS = "\u2026"
 
 class TokenOptimizer:
     """
@@ -12,12 +33,9 @@ class TokenOptimizer:
     Strategy:
     1. JSON -> TOON (Token Optimized Object Notation): Minify, remove obvious keys if positional is clear.
     2. Stop word removal for context (aggressive).
-    3. Caching: MD5 hash of prompts to avoid re-calls (simulated here, typically would use DB/Redis).
+    3. Caching: SHA256 of the optimized prompt + model/params, persisted by LLMResponseCache (app/core/llm_cache.py).
     """
     
-    def __init__(self):
-        self._cache = {} # In-memory cache for the run
-    
     def to_toon(self, data: Dict[str, Any]) -> str:
         """
         Converts detailed JSON to a minimal string representation.
@@ -36,13 +54,26 @@ class TokenOptimizer:
         # Default fallback: Minified JSON
         return json.dumps(data, separators=(',', ':'))
 
+    def to_toon_table(self, header: List[str], rows: List[List[Any]]) -> str:
+        """
+        Generic TOON table: header line + one pipe-delimited line per row.
+        Example: (["ID", "TITLE"], [[1, "Budget 2025"]]) -> "ID|TITLE\n1|Budget 2025"
+        Cells are flattened so embedded '|' or newlines can't shift columns.
+        """
+        lines = ["|".join(header)]
+        for row in rows:
+            cells = [re.sub(r'\s+', ' ', str(c if c is not None else "")).replace('|', '/').strip() for c in row]
+            lines.append("|".join(cells))
+        return "\n".join(lines)
+
     def compress_text(self, text: str) -> str:
         """
-        Normalizes whitespace. 
+        Normalizes whitespace. Line breaks are kept (blank lines dropped) because
+        TOON tables are line-oriented.
         Note: Removed stop-word removal as it was too destructive for news analysis.
         """
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
+        lines = (re.sub(r'[^\S\n]+', ' ', line).strip() for line in text.split('\n'))
+        return "\n".join(line for line in lines if line)
 
     def optimize_prompt_structure(self, system_prompt: str, user_data: Any) -> str:
         """
@@ -51,9 +82,138 @@ class TokenOptimizer:
         data_str = self.to_toon(user_data)
         return f"{system_prompt}\n\nDATA:\n{data_str}"
 
+    def estimate_tokens(self, text: str) -> int:
+        """
+        Fast script-aware token estimate. Not exact - prefer the provider's `usage` block when present.
+        """
+        if not text:
+            return 0
+        total = 0.0
+        for piece in _TOKEN_PIECE_RE.findall(text):
+            if _INDIC_RE.match(piece):
+                total += len(piece) * INDIC_TOKENS_PER_CHAR
+            elif piece[0].isdigit():
+                total += math.ceil(len(piece) / DIGITS_PER_TOKEN)
+            elif len(piece) == 1:
+                total += 1
+            else:
+                total += math.ceil(len(piece) / LATIN_CHARS_PER_TOKEN)
+        return int(math.ceil(total))
+
+    def prompt_budget(self, target: int, *fixed: str) -> int:
+        """
+        Tokens left for packed content in a prompt of `target` tokens once the fixed parts
+        (template, system instruction) are paid for. Never more than the model's context window
+        minus the completion reserve.
+        """
+        ceiling = settings.LLM_CONTEXT_WINDOW - settings.LLM_MAX_OUTPUT_TOKENS
+        return max(0, min(target, ceiling) - sum(self.estimate_tokens(self.compress_text(part)) for part in fixed))
+
+    def pack(self, items: Sequence[Tuple[str, str]], budget: int) -> List[Optional[str]]:
+        """
+        Packs (header, body) items, given in priority order, into `budget` tokens.
+        - Sentences repeated across items are kept once (in the highest-priority item);
+          boilerplate found in BOILERPLATE_MIN_ITEMS or more items is dropped everywhere.
+        - Headers are never trimmed. Lowest-priority items are dropped while the rest couldn't
+          each get MIN_ITEM_TOKENS of body.
+        - Bodies are water-filled: short ones go in whole, long ones share the rest equally and
+          are cut at sentence (then word) boundaries, lede first. Rounding slack is handed out
+          again in priority order, so the result lands on the budget unless everything fits.
+        Returns "header body" per item, None for dropped items.
+        """
+        bodies = self._unique_sentences([body for _, body in items])
+        headers = [self.estimate_tokens(header) for header, _ in items]
+        sizes = [sum(tokens for _, tokens in sentences) for sentences in bodies]
+
+        keep = len(items)
+        while keep and sum(headers[:keep]) + sum(min(size, MIN_ITEM_TOKENS) for size in sizes[:keep]) > budget:
+            keep -= 1
+        if keep < len(items):
+            logger.debug("prompt_pack_dropped", items=len(items), dropped=len(items) - keep, budget=budget)
+
+        room = budget - sum(headers[:keep])
+        shares = _water_fill(sizes[:keep], room)
+        taken = [self._take(bodies[i], shares[i]) for i in range(keep)]
+        slack = room - sum(used for _, used in taken)
+        for i in range(keep):
+            if slack <= 0:
+                break
+            if taken[i][1] < sizes[i]:
+                before = taken[i][1]
+                taken[i] = self._take(bodies[i], before + slack)
+                slack -= taken[i][1] - before
+
+        packed: List[Optional[str]] = [None] * len(items)
+        for i, (text, _) in enumerate(taken):
+            packed[i] = f"{items[i][0]} {text}".strip()
+        return packed
+
+    def _unique_sentences(self, bodies: Sequence[str]) -> List[List[Tuple[str, int]]]:
+        # [(sentence, tokens)] per body, minus repeats and cross-source boilerplate
+        split = [
+            [s for s in _SENTENCE_RE.split(re.sub(r'\s+', ' ', body or "").strip()) if s]
+            for body in bodies
+        ]
+        keys = [[_NON_WORD_RE.sub(' ', s.lower()).strip() for s in sentences] for sentences in split]
+        spread = Counter(key for item_keys in keys for key in set(item_keys))
+        seen = set()
+        result = []
+        for sentences, item_keys in zip(split, keys):
+            kept = []
+            for sentence, key in zip(sentences, item_keys):
+                if not key or key in seen or spread[key] >= BOILERPLATE_MIN_ITEMS:
+                    continue
+                seen.add(key)
+                kept.append((sentence, self.estimate_tokens(sentence)))
+            result.append(kept)
+        return result
+
+    def _take(self, sentences: Sequence[Tuple[str, int]], share: int) -> Tuple[str, int]:
+        """Longest lede-first prefix within `share` tokens: whole sentences, then words + ellipsis.
+        Token estimates are additive over whitespace-separated pieces, so the count is exact."""
+        out, used = [], 0
+        for sentence, tokens in sentences:
+            if used + tokens <= share:
+                out.append(sentence)
+                used += tokens
+                continue
+            words, room = [], share - used - 1 # 1 token for the ellipsis
+            for word in sentence.split(' '):
+                cost = self.estimate_tokens(word)
+                if cost > room:
+                    break
+                words.append(word)
+                room -= cost
+            if words:
+                out.append(" ".join(words) + ELLIPSIS)
+                used = share - room
+            break
+        return " ".join(out), used
+
     def report_savings(self, original_text: str, optimized_text: str):
-        orig_len = len(original_text.split()) # Approx tokens
-        opt_len = len(optimized_text.split())
+        orig_len = self.estimate_tokens(original_text)
+        opt_len = self.estimate_tokens(optimized_text)
         saved = max(0, orig_len - opt_len)
         logger.info("token_optimization", original=orig_len, optimized=opt_len, saved=saved)
         return saved
+
+
+def _water_fill(sizes: Sequence[int], total: int) -> List[int]:
+    """Max-min fair split of `total`: sizes that fit an equal share get all they need,
+    the rest split what remains (remainder to the highest priority)."""
+    shares = [0] * len(sizes)
+    remaining = list(range(len(sizes)))
+    while remaining and total > 0:
+        share = total // len(remaining)
+        small = [i for i in remaining if sizes[i] <= share]
+        if not small:
+            for i in remaining:
+                shares[i] = share
+            for i in remaining[:total - share * len(remaining)]:
+                shares[i] += 1
+            break
+        for i in small:
+            shares[i] = sizes[i]
+            total -= sizes[i]
+        remaining = [i for i in remaining if sizes[i] > share]
+    return shares
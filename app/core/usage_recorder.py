@@ -0,0 +1,99 @@
+import asyncio
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import structlog
+from sqlalchemy import insert
+
+from app.config import get_settings
+from app.db.models import TokenUsage
+from app.db.session import AsyncSessionLocal
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+_STOP = object()
+
+
+class TokenUsageRecorder:
+    """
+    Non-blocking TokenUsage writer.
+    record() only does a put_nowait on an in-memory queue; a background task drains it and
+    writes one multi-row INSERT per batch (every TOKEN_USAGE_FLUSH_SECONDS or TOKEN_USAGE_BATCH_SIZE rows).
+    Accounting therefore never adds DB latency to an LLM call. If the queue is full, records are
+    dropped with a warning rather than applying backpressure to the call path.
+    """
+
+    def __init__(self, flush_interval: float, batch_size: int, max_queue: int = 10000):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._loop = loop
+            self._task = loop.create_task(self._run())
+
+    def record(self, agent_name: str, prompt_tokens: int, completion_tokens: int, optimized_savings: int = 0):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait({
+                "agent_name": agent_name,
+                "prompt_tokens": int(prompt_tokens),
+                "completion_tokens": int(completion_tokens),
+                "optimized_savings": int(optimized_savings),
+            })
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("token_usage_dropped", agent=agent_name, dropped=self.dropped)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+
+    async def _write(self, rows: List[Dict[str, Any]]):
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(insert(TokenUsage), rows)
+                await session.commit()
+        except Exception as e:
+            # Accounting must never take the pipeline down
+            logger.error("token_usage_write_failed", rows=len(rows), error=str(e))
+
+    async def close(self):
+        """Flushes everything queued so far and stops the writer. The next record() restarts it."""
+        if self._task is None or self._task.done() or self._loop is not asyncio.get_running_loop():
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+
+@lru_cache()
+def get_usage_recorder() -> TokenUsageRecorder:
+    return TokenUsageRecorder(settings.TOKEN_USAGE_FLUSH_SECONDS, settings.TOKEN_USAGE_BATCH_SIZE)
@@ -0,0 +1,27 @@
+from typing import Any, Dict, List, Type
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Base
+
+
+def _dialect_insert(db: AsyncSession):
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        return pg_insert
+    if dialect == "sqlite":
+        return sqlite_insert
+    raise NotImplementedError(f"Bulk upsert not supported for dialect '{dialect}'")
+
+
+async def insert_ignore(db: AsyncSession, model: Type[Base], rows: List[Dict[str, Any]]) -> None:
+    """
+    Multi-row INSERT ... ON CONFLICT DO NOTHING for asyncpg and aiosqlite.
+    Conflicts on any unique constraint are skipped, so two overlapping runs inserting
+    the same article can't fail each other.
+    """
+    if not rows:
+        return
+    stmt = _dialect_insert(db)(model).on_conflict_do_nothing()
+    await db.execute(stmt, rows)
@@ -0,0 +1,47 @@
+from typing import Any, AsyncIterator, List, Optional, Sequence
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+async def iter_chunks(
+    db: AsyncSession,
+    columns: Sequence[Any],
+    *criteria,
+    key=None,
+    chunk_size: Optional[int] = None,
+) -> AsyncIterator[List[Row]]:
+    """
+    Keyset-paginated iteration: yields lists of rows ordered by `key` (default: first column).
+    `key` must be unique - use the primary key.
+    Each page is `WHERE <criteria> AND key > :last ORDER BY key LIMIT n`, so every query is an
+    index range scan and memory stays at one chunk regardless of backlog size.
+
+    Only the given columns are loaded - never pass whole entities with large Text fields.
+    Safe to commit (and to update rows out of the filter) between chunks: the cursor is the
+    last key seen, not an OFFSET.
+    """
+    key = key if key is not None else columns[0]
+    key_name = key.key
+    chunk_size = chunk_size or settings.DB_CHUNK_SIZE
+    if key_name not in [c.key for c in columns]:
+        columns = [*columns, key]
+
+    last = None
+    while True:
+        stmt = select(*columns).where(*criteria)
+        if last is not None:
+            stmt = stmt.where(key > last)
+        stmt = stmt.order_by(key).limit(chunk_size)
+
+        rows = (await db.execute(stmt)).all()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        last = getattr(rows[-1], key_name)
@@ -0,0 +1,57 @@
+import structlog
+from sqlalchemy import delete, func, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import Index, Table
+
+from app.db.models import Base
+
+logger = structlog.get_logger()
+
+
+def upgrade_schema(conn: Connection):
+    """
+    Additive, idempotent schema upgrade for databases created by an older version.
+    `create_all` only creates missing tables; this adds missing nullable columns and
+    missing indexes to tables that already exist (rows violating a new unique index are
+    de-duplicated first, keeping the newest). Run via `conn.run_sync(upgrade_schema)`.
+    Destructive changes (drops, type changes) are deliberately out of scope.
+    """
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    preparer = conn.dialect.identifier_preparer
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            if not column.nullable and column.server_default is None:
+                # Rule 9: Force clarity - can't backfill a NOT NULL column without a default
+                logger.error("schema_upgrade_skipped", table=table.name, column=column.name, reason="NOT NULL without server default")
+                continue
+            ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=conn.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            conn.execute(text(ddl))
+            logger.info("schema_column_added", table=table.name, column=column.name)
+
+        existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            if index.unique:
+                _drop_duplicates(conn, table, index)
+            index.create(conn)
+            logger.info("schema_index_added", table=table.name, index=index.name)
+
+
+def _drop_duplicates(conn: Connection, table: Table, index: Index):
+    # Keep the row with the highest primary key (the newest, for autoincrement ids) per unique key
+    pk = list(table.primary_key.columns)[0]
+    keep = select(func.max(pk)).group_by(*index.columns).scalar_subquery()
+    result = conn.execute(delete(table).where(pk.not_in(keep)))
+    if result.rowcount:
+        logger.warning("schema_duplicates_removed", table=table.name, index=index.name, rows=result.rowcount)
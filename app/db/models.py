@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import List, Optional
-from sqlalchemy import String, Integer, DateTime, Boolean, Text, ForeignKey, Column, Float
+from sqlalchemy import String, Integer, DateTime, Boolean, Text, ForeignKey, Column, Float, LargeBinary, Index
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.ext.asyncio import AsyncAttrs
 
@@ -13,13 +13,18 @@ class Article(Base):
     id: Mapped[str] = mapped_column(String, primary_key=True) # SHA256 deterministic ID
     title: Mapped[str] = mapped_column(String, index=True)
     url: Mapped[str] = mapped_column(String, unique=True, index=True)
-    content_raw: Mapped[str] = mapped_column(Text)
-    content_clean: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Large bodies are deferred: loading an Article entity never pulls them in. Agents select the
+    # columns they need explicitly; raiseload turns an accidental lazy load (which can't work on
+    # an AsyncSession anyway) into a clear error.
+    content_raw: Mapped[str] = mapped_column(Text, deferred=True, deferred_raiseload=True)
+    content_clean: Mapped[Optional[str]] = mapped_column(Text, nullable=True, deferred=True, deferred_raiseload=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(String, nullable=True) # SHA256 of content_clean
     summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     source: Mapped[str] = mapped_column(String)
     source_type: Mapped[str] = mapped_column(String) # 'gov' or 'independent'
     language: Mapped[str] = mapped_column(String) # 'en' or 'te'
     domain: Mapped[Optional[str]] = mapped_column(String, index=True, nullable=True)
+    domain_source: Mapped[Optional[str]] = mapped_column(String, nullable=True) # 'llm', 'local' or 'inherited'; NULL on pre-existing labels (LLM)
     pub_date: Mapped[datetime] = mapped_column(DateTime)
     ingested_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     
@@ -27,8 +32,51 @@ class Article(Base):
     is_valid: Mapped[bool] = mapped_column(Boolean, default=True)
     validation_error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
 
+    # Near-duplicate clustering: set on syndicated copies, NULL on canonical articles
+    canonical_id: Mapped[Optional[str]] = mapped_column(String, index=True, nullable=True)
+
+# Indexes for the agents' hot queries. Partial-index predicates are written with the same
+# expressions the agents filter on, so both Postgres and SQLite can match them to the query.
+
+# CleaningAgent: uncleaned, still-valid articles in keyset (id) order
+Index(
+    "ix_articles_uncleaned", Article.id,
+    postgresql_where=(Article.content_clean == None) & (Article.is_valid == True),
+    sqlite_where=(Article.content_clean == None) & (Article.is_valid == True),
+)
+# DomainAgent: canonical, cleaned, valid articles still missing a domain
+Index(
+    "ix_articles_unclassified", Article.id,
+    postgresql_where=(Article.domain == None) & (Article.content_clean != None) & (Article.is_valid == True) & (Article.canonical_id == None),
+    sqlite_where=(Article.domain == None) & (Article.content_clean != None) & (Article.is_valid == True) & (Article.canonical_id == None),
+)
+# NarrativeAgent / read API: (domain, is_valid) ORDER BY pub_date DESC
+Index("ix_articles_domain_valid_pubdate", Article.domain, Article.is_valid, Article.pub_date.desc())
+# ValidationAgent: source_type + recent window
+Index("ix_articles_source_type_pubdate", Article.source_type, Article.pub_date.desc())
+
+class ArticleSignature(Base):
+    __tablename__ = "article_signatures"
+
+    # MinHash signature of content_clean (uint32 array bytes), used to verify LSH candidates
+    article_id: Mapped[str] = mapped_column(String, primary_key=True)
+    signature: Mapped[bytes] = mapped_column(LargeBinary)
+
+class LSHBucket(Base):
+    __tablename__ = "lsh_buckets"
+
+    # One row per (band hash, article). band_key leads the PK, so candidate lookup is an index seek.
+    band_key: Mapped[str] = mapped_column(String, primary_key=True)
+    article_id: Mapped[str] = mapped_column(String, primary_key=True)
+
 class Narrative(Base):
     __tablename__ = "narratives"
+    __table_args__ = (
+        # One narrative per domain per ISO week. A unique index (not a table constraint) so
+        # existing SQLite databases can gain it without a table rebuild - see migrations.py.
+        Index("uq_narratives_domain_week_year", "domain", "week_number", "year", unique=True),
+        Index("ix_narratives_created_at", "created_at"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     domain: Mapped[str] = mapped_column(String)
@@ -37,6 +85,11 @@ class Narrative(Base):
     narrative_text: Mapped[str] = mapped_column(Text)
     sentiment: Mapped[str] = mapped_column(String)
     action_items: Mapped[Optional[str]] = mapped_column(Text)
+
+    # Input fingerprint: SHA256 over the sorted (article id, content_hash) pairs that fed this narrative.
+    # Unchanged fingerprint -> no regeneration; input_article_ids (JSON list) enables delta updates.
+    input_fingerprint: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    input_article_ids: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
@@ -49,3 +102,46 @@ class TokenUsage(Base):
     completion_tokens: Mapped[int] = mapped_column(Integer)
     optimized_savings: Mapped[int] = mapped_column(Integer) # How many tokens saved by optimizer
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class FeedState(Base):
+    __tablename__ = "feed_states"
+
+    # Per-source HTTP cache validators, used for conditional GET on the next run
+    url: Mapped[str] = mapped_column(String, primary_key=True)
+    etag: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    last_modified: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(String, nullable=True) # SHA256 of last processed body
+    last_status: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    last_fetched_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_changed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+class PipelineRun(Base):
+    __tablename__ = "pipeline_runs"
+
+    # One row per pipeline run (id == StageRun.run_id). The run's successful StageRun rows are its
+    # checkpoints: a resumed run skips those stages and reuses their recorded outputs.
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    status: Mapped[str] = mapped_column(String, index=True) # 'running', 'success', 'failed' or 'interrupted'
+    stages: Mapped[str] = mapped_column(Text) # JSON list of the stage names selected for this run
+    attempts: Mapped[int] = mapped_column(Integer, default=1)
+    started_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+class StageRun(Base):
+    __tablename__ = "stage_runs"
+    __table_args__ = (
+        # "Latest successful output of stage X" lookups for partial re-runs
+        Index("ix_stage_runs_stage_status_started", "stage", "status", "started_at"),
+    )
+
+    # One row per pipeline stage execution; run_id groups the stages of one pipeline run
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    run_id: Mapped[str] = mapped_column(String, index=True)
+    stage: Mapped[str] = mapped_column(String)
+    status: Mapped[str] = mapped_column(String) # 'running', 'success', 'failed', 'skipped' or 'interrupted'
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    duration_seconds: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    output: Mapped[Optional[str]] = mapped_column(Text, nullable=True) # JSON of the stage's result dict
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
@@ -1,24 +1,168 @@
+import time
+import uuid
+from typing import Any, Dict
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, AsyncAdaptedQueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+import structlog
 from app.config import get_settings
 from app.db.models import Base
+from app.db.migrations import upgrade_schema
+from app.core.metrics import install_db_timing
 
+logger = structlog.get_logger()
 settings = get_settings()
 
+
+class PoolMetrics:
+    """Checkout/wait counters, so the pool can be sized from real load instead of guesses."""
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    # _do_get is where QueuePool blocks for a free connection - time exactly that
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - started)
+
+
+def resolve_profile(url: str) -> str:
+    profile = settings.DB_ENGINE_PROFILE.lower()
+    if profile != "auto":
+        return profile
+    if url.startswith("sqlite"):
+        return "sqlite"
+    # Supabase's transaction pooler (PgBouncer/Supavisor) listens on 6543
+    if ":6543" in url or "pooler.supabase.com" in url:
+        return "pgbouncer"
+    return "pooled"
+
+
+def engine_options(profile: str) -> Dict[str, Any]:
+    pooled = {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if profile == "pooled":
+        # Direct Postgres: persistent connections + asyncpg/SQLAlchemy prepared statement caches
+        return {
+            **pooled,
+            "connect_args": {
+                "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+                "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            },
+        }
+    if profile == "pgbouncer":
+        # Transaction pooler: the server-side pooler owns connections, and a backend may change
+        # between statements, so no client pool, no statement caches, and unique statement names.
+        return {
+            "poolclass": NullPool,
+            "connect_args": {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            },
+        }
+    if profile == "sqlite":
+        # Pool reuse avoids re-opening the file; pragmas are applied per connection below
+        return {**pooled, "pool_recycle": -1}
+    if profile == "null":
+        return {"poolclass": NullPool}
+    raise ValueError(f"Unknown DB_ENGINE_PROFILE '{profile}'")
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL: readers don't block the writer, which matters once stages run concurrently
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def _on_connect(dbapi_connection, connection_record):
+    pool_metrics.connects += 1
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_metrics.checkouts += 1
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    pool_metrics.checkins += 1
+
+
+DB_PROFILE = resolve_profile(settings.ASYNC_DATABASE_URL)
+
 engine = create_async_engine(
-    settings.ASYNC_DATABASE_URL, 
+    settings.ASYNC_DATABASE_URL,
     echo=False,
-    poolclass=NullPool,
-    connect_args={
-        "statement_cache_size": 0,
-        "prepared_statement_cache_size": 0
-    }
+    **engine_options(DB_PROFILE)
 )
+if DB_PROFILE == "sqlite":
+    event.listen(engine.sync_engine, "connect", _apply_sqlite_pragmas)
+event.listen(engine.sync_engine, "connect", _on_connect)
+event.listen(engine.sync_engine, "checkout", _on_checkout)
+event.listen(engine.sync_engine, "checkin", _on_checkin)
+install_db_timing(engine.sync_engine)
+
 AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+def get_pool_stats() -> Dict[str, Any]:
+    pool = engine.sync_engine.pool
+    stats = {
+        "profile": DB_PROFILE,
+        "pool_class": type(pool).__name__,
+        "connects": pool_metrics.connects,
+        "checkouts": pool_metrics.checkouts,
+        "checkins": pool_metrics.checkins,
+        "timeouts": pool_metrics.timeouts,
+        "wait_seconds_total": round(pool_metrics.wait_seconds_total, 6),
+        "wait_seconds_max": round(pool_metrics.wait_seconds_max, 6),
+    }
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    return stats
+
 async def init_db():
+    logger.info("db_engine_profile", profile=DB_PROFILE)
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
 
 async def get_db():
     async with AsyncSessionLocal() as session:
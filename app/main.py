@@ -1,15 +1,29 @@
 import asyncio
-from fastapi import FastAPI, BackgroundTasks
+import uuid
+from typing import List, Optional
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Response
 from contextlib import asynccontextmanager
+from pydantic import BaseModel
 import structlog
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from app.config import get_settings
-from app.db.session import init_db, get_db, AsyncSessionLocal
+from app.db.session import init_db, get_db, get_pool_stats
 from app.db.models import Narrative
+from app.core.llm_cache import get_llm_cache
+from app.core.llm_client import close_http_session
+from app.core.usage_recorder import get_usage_recorder
+from app.core.pipeline import Pipeline, Stage
+from app.core.streaming import StreamingPipeline
+from app.core.run_lock import PipelineLock
+from app.core.read_cache import get_read_cache
+from app.core import metrics
+from app.api.read import router as read_router
 
 from app.agents.ingestion_agent import IngestionAgent
 from app.agents.cleaning_agent import CleaningAgent
+from app.agents.dedup_agent import DeduplicationAgent
 from app.agents.domain_agent import DomainAgent
 from app.agents.narrative_agent import NarrativeAgent
 from app.agents.validation_agent import ValidationAgent
@@ -36,69 +50,235 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error("database_init_failed", error=str(e), advice="Check if hostname is correct and accessible.")
         raise
+
+    resume_task = None
+    if settings.PIPELINE_RESUME_ON_STARTUP:
+        resume_task = await _resume_interrupted()
         
     yield
     # Shutdown
+    if resume_task is not None and not resume_task.done():
+        # Cancelling marks the run 'interrupted', so the next boot picks it up again
+        resume_task.cancel()
+        await asyncio.gather(resume_task, return_exceptions=True)
+    await get_usage_recorder().close()
+    await close_http_session()
 
 app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
+app.include_router(read_router)
 
 @app.get("/")
 async def root():
     return {"message": "India Discourse Intelligence System Ready"}
 
-@app.post("/api/v1/trigger-pipeline")
-async def trigger_pipeline(background_tasks: BackgroundTasks):
-    background_tasks.add_task(run_full_pipeline)
-    return {"status": "Pipeline triggered in background"}
+# --- Pipeline stages ---------------------------------------------------------
+# Each stage gets its own session and the result dicts of its dependencies.
 
-async def run_full_pipeline():
-    logger.info("pipeline_start")
-    
-    async with AsyncSessionLocal() as session:
-        # 1. Ingestion
-        ing_agent = IngestionAgent(session)
-        ing_res = await ing_agent.run()
-        
-        # 2. Cleaning
-        clean_agent = CleaningAgent(session)
-        clean_res = await clean_agent.run()
-        
-        # 3. Domain Classification
-        dom_agent = DomainAgent(session)
-        dom_res = await dom_agent.run()
-        
-        # 4. Narrative Generation
-        narr_agent = NarrativeAgent(session)
-        narr_res = await narr_agent.run()
-        
-        # 5. Validation
-        val_agent = ValidationAgent(session)
-        val_res = await val_agent.run()
-        
-        # 6. Idea Generation
-        idea_agent = IdeaGeneratorAgent(session)
-        idea_res = await idea_agent.run()
-        
-        # Fetch Narratives for Report
-        narratives_db = await session.execute(select(Narrative).order_by(Narrative.created_at.desc()).limit(20))
-        narratives = narratives_db.scalars().all()
-        
-        # 7. Report
-        rep_agent = ReportAgent()
+async def _ingestion(db: AsyncSession, inputs: dict) -> dict:
+    return await IngestionAgent(db).run()
+
+async def _cleaning(db: AsyncSession, inputs: dict) -> dict:
+    return await CleaningAgent(db).run()
+
+async def _dedup(db: AsyncSession, inputs: dict) -> dict:
+    # Near-duplicate clustering, before any LLM work
+    return await DeduplicationAgent(db).run()
+
+async def _domain(db: AsyncSession, inputs: dict) -> dict:
+    return await DomainAgent(db).run()
+
+async def _narrative(db: AsyncSession, inputs: dict) -> dict:
+    return await NarrativeAgent(db).run()
+
+async def _validation(db: AsyncSession, inputs: dict) -> dict:
+    return await ValidationAgent(db).run()
+
+async def _stream(db: AsyncSession, inputs: dict) -> dict:
+    # Opens a session per streamed worker; the stage session stays unused
+    return await StreamingPipeline().run()
+
+async def _ideas(db: AsyncSession, inputs: dict) -> dict:
+    return await IdeaGeneratorAgent(db).run()
+
+async def _report(db: AsyncSession, inputs: dict) -> dict:
+    # Fetch Narratives for Report
+    narratives_db = await db.execute(select(Narrative).order_by(Narrative.created_at.desc()).limit(20))
+    narratives = narratives_db.scalars().all()
+
+    if "stream" in inputs:
+        streamed = inputs["stream"]
+        swept = streamed.get('swept', {})
         stats = {
-            "ingested": ing_res.get('ingested'),
-            "cleaned": clean_res.get('cleaned'),
-            "classified": dom_res.get('classified')
+            "ingested": streamed.get('ingested'),
+            "cleaned": (streamed.get('cleaned') or 0) + swept.get('cleaned', 0),
+            "classified": (streamed.get('classified') or 0) + swept.get('classified', 0)
         }
-        await rep_agent.run(
-            narratives=narratives,
-            conflicts=val_res.get('conflicts', []),
-            ideas=idea_res.get('ideas', "No ideas generated."),
-            stats=stats
-        )
-        
-    logger.info("pipeline_complete")
+    else:
+        stats = {
+            "ingested": inputs["ingestion"].get('ingested'),
+            "cleaned": inputs["cleaning"].get('cleaned'),
+            "classified": inputs["domain"].get('classified')
+        }
+    return await ReportAgent().run(
+        narratives=narratives,
+        conflicts=inputs["validation"].get('conflicts', []),
+        ideas=inputs["ideas"].get('ideas', "No ideas generated."),
+        stats=stats
+    )
+
+def build_pipeline(streaming: bool) -> Pipeline:
+    # Validation only needs cleaned, de-duplicated articles, so it runs alongside
+    # classification -> narratives -> ideas instead of after them.
+    if streaming:
+        # Ingestion -> classification as one stage of concurrent workers joined by queues
+        article_stages = [Stage("stream", _stream)]
+        classified = validated = ("stream",)
+        report_deps = ("stream", "validation", "ideas")
+    else:
+        article_stages = [
+            Stage("ingestion", _ingestion),
+            Stage("cleaning", _cleaning, deps=("ingestion",)),
+            Stage("dedup", _dedup, deps=("cleaning",)),
+            Stage("domain", _domain, deps=("dedup",)),
+        ]
+        classified, validated = ("domain",), ("dedup",)
+        report_deps = ("ingestion", "cleaning", "domain", "validation", "ideas")
+    return Pipeline([
+        *article_stages,
+        Stage("narrative", _narrative, deps=classified),
+        Stage("validation", _validation, deps=validated),
+        Stage("ideas", _ideas, deps=("narrative",)),
+        Stage("report", _report, deps=report_deps),
+    ])
+
+pipeline = build_pipeline(settings.PIPELINE_STREAMING)
+
+class StageRunRequest(BaseModel):
+    stages: List[str]
+    downstream: bool = False # also re-run every stage that depends on the selected ones
+
+async def _acquire_or_409() -> PipelineLock:
+    # Taken here rather than in the background task, so an overlapping trigger gets a clear answer
+    lock = PipelineLock()
+    if not await lock.acquire():
+        raise HTTPException(status_code=409, detail="A pipeline run is already in progress")
+    return lock
+
+@app.post("/api/v1/trigger-pipeline")
+async def trigger_pipeline(background_tasks: BackgroundTasks, resume: bool = False):
+    lock = await _acquire_or_409()
+    if resume:
+        try:
+            await pipeline.mark_interrupted()
+            resume_id = await pipeline.latest_resumable()
+        except BaseException:
+            await lock.release()
+            raise
+        if resume_id:
+            background_tasks.add_task(run_full_pipeline, resume_id=resume_id, lock=lock)
+            return {"status": "Pipeline resumed in background", "run_id": resume_id}
+    run_id = uuid.uuid4().hex
+    background_tasks.add_task(run_full_pipeline, run_id=run_id, lock=lock)
+    return {"status": "Pipeline triggered in background", "run_id": run_id}
+
+@app.get("/api/v1/pipeline/stages")
+async def pipeline_stages():
+    return [{"name": name, "deps": list(pipeline.stages[name].deps)} for name in pipeline.order]
+
+@app.post("/api/v1/pipeline/stages/run")
+async def run_stages(request: StageRunRequest, background_tasks: BackgroundTasks):
+    try:
+        selected = pipeline.select(request.stages, downstream=request.downstream)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    lock = await _acquire_or_409()
+    run_id = uuid.uuid4().hex
+    background_tasks.add_task(run_full_pipeline, stages=selected, run_id=run_id, lock=lock)
+    return {"status": "Stages triggered in background", "run_id": run_id, "stages": selected}
+
+@app.get("/api/v1/pipeline/runs/{run_id}")
+async def pipeline_run(run_id: str):
+    run = await pipeline.get_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Unknown run_id")
+    return run
+
+@app.post("/api/v1/pipeline/runs/{run_id}/resume")
+async def resume_run(run_id: str, background_tasks: BackgroundTasks):
+    lock = await _acquire_or_409()
+    try:
+        await pipeline.mark_interrupted()
+        run = await pipeline.get_run(run_id)
+        if run is None:
+            raise HTTPException(status_code=404, detail="Unknown run_id")
+        if run["status"] not in ("interrupted", "failed"):
+            raise HTTPException(status_code=409, detail=f"Run is {run['status']}, nothing to resume")
+    except BaseException:
+        await lock.release()
+        raise
+    background_tasks.add_task(run_full_pipeline, resume_id=run_id, lock=lock)
+    return {"status": "Pipeline resumed in background", "run_id": run_id}
+
+@app.get("/api/v1/db/pool")
+async def db_pool_stats():
+    return get_pool_stats()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics disabled (METRICS_ENABLED=false)")
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+async def run_full_pipeline(
+    stages: Optional[List[str]] = None,
+    run_id: Optional[str] = None,
+    resume_id: Optional[str] = None,
+    lock: Optional[PipelineLock] = None,
+):
+    lock = lock or PipelineLock()
+    if not await lock.acquire():
+        logger.warning("pipeline_already_running")
+        return None
+    try:
+        # We hold the single-flight lock, so anything still 'running' belongs to a dead process
+        await pipeline.mark_interrupted()
+        if resume_id:
+            result = await pipeline.resume(resume_id)
+        else:
+            result = await pipeline.run(stages, run_id=run_id)
+        # Flush queued TokenUsage rows so the run's accounting is complete
+        await get_usage_recorder().close()
+        logger.info("pipeline_llm_cache", run_id=result["run_id"], llm_cache=get_llm_cache().stats())
+        return result
+    finally:
+        # Even a failed run may have written narratives/articles: drop cached read responses
+        get_read_cache().invalidate()
+        await lock.release()
+
+async def _resume_interrupted() -> Optional[asyncio.Task]:
+    lock = PipelineLock()
+    if not await lock.acquire():
+        return None
+    try:
+        await pipeline.mark_interrupted()
+        # Only runs cut short by a restart; failed runs wait for an explicit resume
+        resume_id = await pipeline.latest_resumable(statuses=("interrupted",))
+    except BaseException:
+        await lock.release()
+        raise
+    if resume_id is None:
+        await lock.release()
+        return None
+    logger.info("pipeline_resume_on_startup", run_id=resume_id)
+    return asyncio.create_task(run_full_pipeline(resume_id=resume_id, lock=lock))
+
+async def _run_once():
+    try:
+        await run_full_pipeline()
+    finally:
+        await close_http_session()
 
 if __name__ == "__main__":
     # Local dev run
-    asyncio.run(run_full_pipeline())
+    asyncio.run(_run_once())
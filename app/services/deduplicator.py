@@ -1 +1,100 @@
-# Skeleton file: deduplicator.py
+import hashlib
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Universal hashing modulo a Mersenne prime below 2^31: (a * x + b) with x < 2^32 and a, b < 2^31
+# stays below 2^63, so the whole permutation runs in uint64 without overflow.
+_PRIME = np.uint64((1 << 31) - 1)
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def shingles(text: str, size: int) -> Set[int]:
+    """Word k-shingles hashed to 32 bits. Unicode-aware, so Telugu text shingles like English."""
+    words = _WORD_RE.findall((text or "").lower())
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles. Deterministic (fixed seed), so signatures
+    computed in different runs/processes are comparable and can be persisted.
+    """
+
+    def __init__(self, num_perm: Optional[int] = None, shingle_size: Optional[int] = None, seed: int = 1):
+        self.num_perm = num_perm or settings.DEDUP_NUM_PERM
+        self.shingle_size = shingle_size or settings.DEDUP_SHINGLE_SIZE
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_PRIME), self.num_perm).astype(np.uint64)
+        self._b = rng.randint(0, int(_PRIME), self.num_perm).astype(np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        hashed = shingles(text, self.shingle_size)
+        if not hashed:
+            return None
+        values = np.fromiter(hashed, dtype=np.uint64, count=len(hashed))
+        # (n_shingles, num_perm) permuted hashes -> column-wise minimum
+        permuted = (np.outer(values, self._a) + self._b) % _PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    @staticmethod
+    def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        """Estimated Jaccard similarity: fraction of matching MinHash slots."""
+        return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+    @staticmethod
+    def to_bytes(sig: np.ndarray) -> bytes:
+        return sig.astype('<u4').tobytes()
+
+    @staticmethod
+    def from_bytes(raw: bytes) -> np.ndarray:
+        return np.frombuffer(raw, dtype='<u4')
+
+
+class LSHIndex:
+    """
+    Locality-sensitive hashing over MinHash signatures: `bands` x `rows` slices, each hashed
+    to a bucket key. Two articles become candidates if any band collides, so a lookup touches
+    only `bands` buckets instead of the whole corpus. Incremental: add() at any time.
+
+    The in-memory form is used within a batch; the same band_keys() are persisted in the
+    lsh_buckets table so the index survives across runs.
+    """
+
+    def __init__(self, bands: Optional[int] = None, num_perm: Optional[int] = None):
+        self.bands = bands or settings.DEDUP_LSH_BANDS
+        num_perm = num_perm or settings.DEDUP_NUM_PERM
+        if num_perm % self.bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({self.bands})")
+        self.rows = num_perm // self.bands
+        self._buckets: Dict[str, List[str]] = defaultdict(list)
+
+    def band_keys(self, sig: np.ndarray) -> List[str]:
+        keys = []
+        for band in range(self.bands):
+            chunk = sig[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(MinHasher.to_bytes(chunk), digest_size=8).hexdigest()
+            keys.append(f"{band}:{digest}")
+        return keys
+
+    def add(self, item_id: str, sig: np.ndarray):
+        for key in self.band_keys(sig):
+            self._buckets[key].append(item_id)
+
+    def query(self, sig: np.ndarray) -> Set[str]:
+        return self.candidates(self.band_keys(sig))
+
+    def candidates(self, keys: Iterable[str]) -> Set[str]:
+        found: Set[str] = set()
+        for key in keys:
+            found.update(self._buckets.get(key, ()))
+        return found
@@ -0,0 +1,261 @@
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import structlog
+
+from app.config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+# Laplace/Lidstone smoothing for the per-class feature likelihoods
+_ALPHA = 0.1
+# Fewest held-out predictions a calibrated threshold may rest on
+_MIN_CALIBRATION = 20
+
+
+def is_holdout(article_id: str) -> bool:
+    """Deterministic ~20% split by id, so the same articles are held out on every retrain."""
+    return zlib.crc32(article_id.encode("utf-8")) % 5 == 0
+
+
+def is_audited(article_id: str) -> bool:
+    """Deterministic DOMAIN_LOCAL_AUDIT_RATE sample (independent of the holdout split)."""
+    return zlib.crc32(f"audit:{article_id}".encode("utf-8")) % 10000 < settings.DOMAIN_LOCAL_AUDIT_RATE * 10000
+
+
+def document(title: Optional[str], body: Optional[str]) -> str:
+    """The text features are built from - identical for training and prediction."""
+    return f"{title or ''}\n{(body or '')[:settings.DOMAIN_LOCAL_TEXT_CHARS]}"
+
+
+def encode(texts: Sequence[str], dim: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sparse hashed features as (doc_index, feature_index, weight) triples.
+    Features: lowercase word unigrams and bigrams (Unicode-aware, so Telugu works like English),
+    hashed into `dim` buckets; weights are log(1 + tf), L2-normalized per document so long
+    articles don't drown the class priors.
+    """
+    docs, feats = [], []
+    for row, text in enumerate(texts):
+        words = _WORD_RE.findall((text or "").lower())
+        grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        docs.extend([row] * len(grams))
+        feats.extend(zlib.crc32(g.encode("utf-8")) % dim for g in grams)
+    if not docs:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=np.float32)
+
+    keys, counts = np.unique(np.asarray(docs, dtype=np.int64) * dim + np.asarray(feats, dtype=np.int64), return_counts=True)
+    doc_idx, feat_idx = keys // dim, keys % dim
+    weights = np.log1p(counts).astype(np.float32)
+    norms = np.zeros(len(texts), dtype=np.float32)
+    np.add.at(norms, doc_idx, weights * weights)
+    weights /= np.sqrt(norms)[doc_idx]
+    return doc_idx, feat_idx, weights
+
+
+@dataclass(frozen=True)
+class _Model:
+    classes: Tuple[str, ...]
+    log_prior: np.ndarray # (C,)
+    log_likelihood: np.ndarray # (dim, C) float32
+    threshold: float # Min posterior to accept a prediction; inf = model not trusted yet
+    meta: dict
+
+
+class NaiveBayesTrainer:
+    """
+    Streaming multinomial naive Bayes fit: add() labelled chunks as they come off the DB,
+    then build(). Held-out articles (is_holdout) are counted separately and kept encoded, so a
+    single pass gives both the calibration model (training split only) and the final model
+    (all labels) without a second scan.
+    """
+
+    def __init__(self, classes: Sequence[str], dim: Optional[int] = None):
+        self.classes = tuple(classes)
+        self.dim = dim or settings.DOMAIN_LOCAL_FEATURES
+        self._index = {c: i for i, c in enumerate(self.classes)}
+        self._counts = {split: np.zeros((self.dim, len(self.classes)), dtype=np.float64) for split in ("train", "holdout")}
+        self._docs = {split: np.zeros(len(self.classes), dtype=np.int64) for split in ("train", "holdout")}
+        self._holdout: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = []
+
+    @property
+    def samples(self) -> int:
+        return int(self._docs["train"].sum() + self._docs["holdout"].sum())
+
+    def add(self, ids: Sequence[str], texts: Sequence[str], labels: Sequence[str]):
+        keep = [i for i, label in enumerate(labels) if label in self._index]
+        for split in ("train", "holdout"):
+            rows = [i for i in keep if is_holdout(ids[i]) == (split == "holdout")]
+            if not rows:
+                continue
+            y = np.array([self._index[labels[i]] for i in rows], dtype=np.int64)
+            doc_idx, feat_idx, weights = encode([texts[i] for i in rows], self.dim)
+            np.add.at(self._counts[split], (feat_idx, y[doc_idx]), weights)
+            np.add.at(self._docs[split], y, 1)
+            if split == "holdout":
+                self._holdout.append((doc_idx, feat_idx, weights, y))
+
+    def _fit(self, counts: np.ndarray, docs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        log_prior = np.log((docs + 1) / (docs.sum() + len(self.classes)))
+        log_likelihood = np.log(counts + _ALPHA) - np.log(counts.sum(axis=0) + _ALPHA * self.dim)
+        return log_prior, log_likelihood.astype(np.float32)
+
+    def build(self, labelled: int) -> _Model:
+        """Calibrates the acceptance threshold on the held-out split, then fits on everything."""
+        log_prior, log_likelihood = self._fit(self._counts["train"], self._docs["train"])
+        conf, correct = [], []
+        for doc_idx, feat_idx, weights, y in self._holdout:
+            proba = _posterior(log_prior, log_likelihood, doc_idx, feat_idx, weights, len(y))
+            conf.append(proba.max(axis=1))
+            correct.append(proba.argmax(axis=1) == y)
+        conf = np.concatenate(conf) if conf else np.zeros(0)
+        correct = np.concatenate(correct) if correct else np.zeros(0, dtype=bool)
+        threshold, coverage, precision = _calibrate(conf, correct)
+
+        log_prior, log_likelihood = self._fit(self._counts["train"] + self._counts["holdout"], self._docs["train"] + self._docs["holdout"])
+        meta = {
+            "trained_at": time.time(),
+            "labelled": labelled,
+            "samples": self.samples,
+            "holdout": int(len(conf)),
+            "holdout_accuracy": round(float(correct.mean()), 4) if len(conf) else None,
+            "threshold": None if np.isinf(threshold) else round(float(threshold), 6),
+            "holdout_coverage": round(coverage, 4),
+            "holdout_precision": round(precision, 4) if precision is not None else None,
+        }
+        return _Model(self.classes, log_prior, log_likelihood, threshold, meta)
+
+
+def _posterior(log_prior, log_likelihood, doc_idx, feat_idx, weights, n_docs: int) -> np.ndarray:
+    # Vectorized scoring: scatter-add each (doc, feature) weight x per-class log-likelihood
+    scores = np.tile(log_prior, (n_docs, 1))
+    np.add.at(scores, doc_idx, log_likelihood[feat_idx] * weights[:, None])
+    scores -= scores.max(axis=1, keepdims=True)
+    proba = np.exp(scores)
+    proba /= proba.sum(axis=1, keepdims=True)
+    return proba
+
+
+def _calibrate(conf: np.ndarray, correct: np.ndarray) -> Tuple[float, float, Optional[float]]:
+    """
+    Lowest confidence at which held-out predictions at or above it still reach
+    DOMAIN_LOCAL_TARGET_PRECISION (never below DOMAIN_LOCAL_MIN_CONFIDENCE).
+    Returns (threshold, coverage, precision); threshold is inf when no cut qualifies.
+    """
+    if len(conf) < _MIN_CALIBRATION:
+        return float("inf"), 0.0, None
+    order = np.argsort(-conf, kind="stable")
+    hits = np.cumsum(correct[order])
+    accepted = np.arange(1, len(conf) + 1)
+    precision = hits / accepted
+    ok = np.nonzero(
+        (precision >= settings.DOMAIN_LOCAL_TARGET_PRECISION)
+        & (accepted >= _MIN_CALIBRATION)
+        & (conf[order] >= settings.DOMAIN_LOCAL_MIN_CONFIDENCE)
+    )[0]
+    if not ok.size:
+        return float("inf"), 0.0, None
+    cut = ok[-1]
+    # Ties at the cut would be accepted too - include them in the reported coverage
+    threshold = float(conf[order][cut])
+    n = int(np.count_nonzero(conf >= threshold))
+    return threshold, n / len(conf), float(correct[conf >= threshold].mean())
+
+
+class LocalDomainClassifier:
+    """
+    CPU domain classifier trained on the labels the LLM already assigned: hashed word
+    uni/bigrams + multinomial naive Bayes, scored a whole batch at a time with NumPy.
+    Only predictions at or above the calibrated threshold are used; everything else goes to
+    the LLM. The model is one .npz file; retraining swaps it in atomically, so concurrent
+    predict() calls always see a consistent model.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.DOMAIN_LOCAL_MODEL_PATH
+        self._model: Optional[_Model] = None
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def meta(self) -> dict:
+        model = self._model
+        return dict(model.meta) if model else {}
+
+    @property
+    def ready(self) -> bool:
+        model = self._model
+        return model is not None and not np.isinf(model.threshold)
+
+    def needs_training(self, labelled: int) -> bool:
+        if labelled < settings.DOMAIN_LOCAL_MIN_SAMPLES:
+            return False
+        model = self._model
+        if model is None:
+            return True
+        trained_on = model.meta.get("labelled", 0)
+        if labelled >= trained_on * (1 + settings.DOMAIN_LOCAL_RETRAIN_GROWTH):
+            return True
+        age_hours = (time.time() - model.meta.get("trained_at", 0)) / 3600
+        return labelled > trained_on and age_hours >= settings.DOMAIN_LOCAL_RETRAIN_HOURS
+
+    def predict(self, texts: Sequence[str]) -> List[Tuple[Optional[str], float]]:
+        """[(domain or None, confidence)] per text; None = below threshold, ask the LLM."""
+        model = self._model
+        if model is None or not texts:
+            return [(None, 0.0)] * len(texts)
+        doc_idx, feat_idx, weights = encode(texts, model.log_likelihood.shape[0])
+        proba = _posterior(model.log_prior, model.log_likelihood, doc_idx, feat_idx, weights, len(texts))
+        best, conf = proba.argmax(axis=1), proba.max(axis=1)
+        return [
+            (model.classes[b] if c >= model.threshold else None, float(c))
+            for b, c in zip(best.tolist(), conf.tolist())
+        ]
+
+    def install(self, model: _Model):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp.npz"
+            np.savez(
+                tmp,
+                log_prior=model.log_prior,
+                log_likelihood=model.log_likelihood,
+                threshold=np.array(model.threshold),
+                classes=np.array(json.dumps(list(model.classes))),
+                meta=np.array(json.dumps(model.meta)),
+            )
+            os.replace(tmp, self.path)
+            self._model = model
+        logger.info("domain_classifier_trained", **model.meta)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                self._model = _Model(
+                    classes=tuple(json.loads(str(data["classes"]))),
+                    log_prior=data["log_prior"],
+                    log_likelihood=data["log_likelihood"],
+                    threshold=float(data["threshold"]),
+                    meta=json.loads(str(data["meta"])),
+                )
+        except Exception as e:
+            # A corrupt or old-format model is just retrained on the next run
+            logger.warning("domain_classifier_load_failed", path=self.path, error=str(e))
+
+
+@lru_cache()
+def get_domain_classifier() -> LocalDomainClassifier:
+    return LocalDomainClassifier()
@@ -0,0 +1,93 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+from langdetect import detect, LangDetectException, DetectorFactory
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# (id, content_raw, declared_language)
+CleanTask = Tuple[str, str, str]
+# (id, content_clean or None, detected_language, error or None)
+CleanResult = Tuple[str, Optional[str], str, Optional[str]]
+
+MIN_CLEAN_LENGTH = 20
+MIN_DETECT_LENGTH = 50
+
+
+def _init_worker():
+    # langdetect is probabilistic; a fixed seed keeps results identical across workers and runs (Rule 5)
+    DetectorFactory.seed = 0
+
+
+def clean_one(article_id: str, content_raw: str, language: str) -> CleanResult:
+    """Pure function: HTML -> normalized text + detected language. Safe to run in any process."""
+    try:
+        # 1. Clean HTML
+        soup = BeautifulSoup(content_raw or "", 'html.parser')
+        text = soup.get_text(separator=' ')
+
+        # 2. Normalize whitespace
+        text = " ".join(text.split())
+
+        # 3. Verify language (optional double-check)
+        # Rule 10: Interrogate the data
+        try:
+            detected = detect(text) if len(text) > MIN_DETECT_LENGTH else language
+        except LangDetectException:
+            detected = language # fallback
+
+        if len(text) < MIN_CLEAN_LENGTH:
+            return article_id, None, detected, "Content too short"
+        return article_id, text, detected, None
+    except Exception as e:
+        return article_id, None, language, f"Cleaning failed: {str(e)}"
+
+
+def clean_batch(batch: List[CleanTask]) -> List[CleanResult]:
+    # One pickled round trip per batch instead of per article
+    return [clean_one(*task) for task in batch]
+
+
+class CleaningEngine:
+    """
+    Runs clean_batch over a ProcessPoolExecutor so BeautifulSoup/langdetect use every core
+    and never block the event loop. Only the small result tuples travel back to the parent.
+    workers=1 skips the pool and cleans in a single worker thread.
+    """
+
+    def __init__(self, workers: Optional[int] = None, batch_size: Optional[int] = None):
+        workers = workers if workers is not None else settings.CLEANING_WORKERS
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size or settings.CLEANING_BATCH_SIZE
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def __aenter__(self):
+        if self.workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        else:
+            _init_worker()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._pool:
+            # Don't block the event loop waiting for workers to exit
+            await asyncio.to_thread(self._pool.shutdown, True)
+            self._pool = None
+
+    async def clean(self, tasks: List[CleanTask]) -> List[CleanResult]:
+        if not tasks:
+            return []
+        batches = [tasks[i:i + self.batch_size] for i in range(0, len(tasks), self.batch_size)]
+
+        if self._pool is None:
+            results = [await asyncio.to_thread(clean_batch, b) for b in batches]
+        else:
+            loop = asyncio.get_running_loop()
+            results = await asyncio.gather(*[loop.run_in_executor(self._pool, clean_batch, b) for b in batches])
+
+        return [r for batch in results for r in batch]
@@ -0,0 +1,100 @@
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+import markdown
+from jinja2 import Environment, FileSystemLoader
+from markupsafe import Markup, escape
+
+from app.config import get_settings
+from app.core.metrics import record_cache
+
+settings = get_settings()
+
+TEMPLATE_DIR = os.path.join(settings.BASE_DIR, "app", "templates")
+# Output format -> content type (for uploads and the read API)
+CONTENT_TYPES = {
+    "md": "text/markdown; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+    "json": "application/json",
+}
+
+
+# URL-bearing attributes in markdown's output; only http(s) links survive
+_URL_ATTR_RE = re.compile(r'\s(href|src)="([^"]*)"')
+_SAFE_URL_RE = re.compile(r'^https?://', re.IGNORECASE)
+
+
+def _safe_url_attr(match: re.Match) -> str:
+    # Decode entities and drop whitespace/control chars the way a browser would before
+    # looking at the scheme ("jav&#x61;script:", " javascript:")
+    url = re.sub(r'[\x00-\x20]+', '', html.unescape(match.group(2)))
+    return match.group(0) if _SAFE_URL_RE.match(url) else ""
+
+
+def _markdown(text: Optional[str]) -> Markup:
+    # LLM output is untrusted (and prompt-injectable): escape any HTML first, then let markdown
+    # add its own - and strip javascript:/data:/... URLs that link syntax can still produce
+    rendered = markdown.markdown(str(escape(text or "")))
+    return Markup(_URL_ATTR_RE.sub(_safe_url_attr, rendered))
+
+
+class ReportRenderer:
+    """
+    Renders one report dict to Markdown, HTML and JSON.
+    - Templates (app/templates/*.j2) are compiled once and kept by the Environment
+      (auto_reload off, so there's no per-render stat() either).
+    - Domain sections are rendered separately and cached by a digest of their content, so a
+      run where one domain's narrative changed re-renders only that section.
+    Thread-safe: render() is meant to run via asyncio.to_thread.
+    """
+
+    def __init__(self, template_dir: Optional[str] = None, cache_size: Optional[int] = None):
+        self.env = Environment(
+            loader=FileSystemLoader(template_dir or TEMPLATE_DIR),
+            autoescape=lambda name: bool(name) and name.endswith(".html.j2"),
+            keep_trailing_newline=True,
+            auto_reload=False,
+        )
+        self.env.filters["markdown"] = _markdown
+        self.cache_size = cache_size or settings.REPORT_SECTION_CACHE_SIZE
+        self._sections: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, data: Dict[str, Any]) -> Dict[str, str]:
+        """{format: document} for every format in CONTENT_TYPES."""
+        rendered = {}
+        for fmt in ("md", "html"):
+            sections = [self._section(fmt, n) for n in data["narratives"]]
+            if fmt == "html":
+                sections = [Markup(s) for s in sections]
+            rendered[fmt] = self.env.get_template(f"report.{fmt}.j2").render(**data, sections=sections)
+        rendered["json"] = json.dumps(data, ensure_ascii=False, indent=2, default=str)
+        return rendered
+
+    def _section(self, fmt: str, narrative: Dict[str, Any]) -> str:
+        material = json.dumps([fmt, narrative["domain"], narrative["narrative_text"], narrative["sentiment"]], ensure_ascii=False)
+        key = hashlib.sha256(material.encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._sections:
+                self._sections.move_to_end(key)
+                record_cache("report_sections", hits=1)
+                return self._sections[key]
+        record_cache("report_sections", misses=1)
+        section = self.env.get_template(f"report_section.{fmt}.j2").render(n=narrative)
+        with self._lock:
+            self._sections[key] = section
+            while len(self._sections) > self.cache_size:
+                self._sections.popitem(last=False)
+        return section
+
+
+@lru_cache()
+def get_report_renderer() -> ReportRenderer:
+    return ReportRenderer()
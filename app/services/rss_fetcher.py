@@ -1 +1,168 @@
-# Skeleton file: rss_fetcher.py
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+import feedparser
+import structlog
+
+from app.config import get_settings
+from app.core.metrics import FEED_FETCH_SECONDS
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+
+@dataclass
+class FeedResult:
+    url: str
+    language: str
+    status: Optional[int] = None
+    feed: Any = None  # feedparser.FeedParserDict when parsed
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    headers: Dict[str, str] = field(default_factory=dict)
+    # Change detection
+    not_modified: bool = False  # 304, or body hash identical to the last processed one
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.feed is not None
+
+
+class RSSFetcher:
+    """
+    Async RSS fetcher.
+    - One shared aiohttp session (keep-alive, DNS cache) for the whole run.
+    - Global concurrency cap plus a per-host cap so one slow publisher can't hog the pool
+      and we don't hammer a single site with hundreds of parallel requests.
+    - Per-feed timeout: a hung source fails on its own, the rest of the run continues.
+    - feedparser is CPU-bound and synchronous, so raw bytes are parsed in a worker thread.
+    - Conditional GET: previous ETag/Last-Modified are sent back, and a 304 or an unchanged
+      body hash skips parsing entirely (result.not_modified).
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        per_host_concurrency: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+    ):
+        self.max_concurrency = max_concurrency or settings.FEED_MAX_CONCURRENCY
+        self.per_host_concurrency = per_host_concurrency or settings.FEED_PER_HOST_CONCURRENCY
+        self.timeout_seconds = timeout_seconds or settings.FEED_TIMEOUT_SECONDS
+        self._global = asyncio.Semaphore(self.max_concurrency)
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrency,
+            limit_per_host=self.per_host_concurrency,
+            ttl_dns_cache=300,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers={"User-Agent": settings.FEED_USER_AGENT},
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self._hosts[host]
+
+    async def fetch(self, url: str, language: str, state: Optional[Dict[str, Any]] = None) -> FeedResult:
+        state = state or {}
+        result = FeedResult(
+            url=url,
+            language=language,
+            etag=state.get("etag"),
+            last_modified=state.get("last_modified"),
+            content_hash=state.get("content_hash"),
+        )
+        request_headers = {}
+        if result.etag:
+            request_headers["If-None-Match"] = result.etag
+        if result.last_modified:
+            request_headers["If-Modified-Since"] = result.last_modified
+
+        started = time.perf_counter()
+        try:
+            await self._fetch_into(result, request_headers)
+        except asyncio.TimeoutError:
+            result.error = f"Timeout after {self.timeout_seconds}s"
+        except aiohttp.ClientError as e:
+            result.error = f"{type(e).__name__}: {e}"
+        except Exception as e:
+            # e.g. a malformed source URL (ValueError from urlsplit): fail this feed, not the stage
+            result.error = f"{type(e).__name__}: {e}"
+        finally:
+            result.elapsed = time.perf_counter() - started
+            FEED_FETCH_SECONDS.labels(feed=url, status="error" if result.error else str(result.status)).observe(result.elapsed)
+
+        if result.error:
+            logger.warning("feed_fetch_failed", url=url, error=result.error, elapsed=round(result.elapsed, 3))
+        elif result.not_modified:
+            logger.info("feed_not_modified", url=url, status=result.status)
+        return result
+
+    async def _fetch_into(self, result: FeedResult, request_headers: Dict[str, str]):
+        async with self._global, self._host_semaphore(result.url):
+            timeout = aiohttp.ClientTimeout(total=self.timeout_seconds)
+            async with self._session.get(result.url, headers=request_headers, timeout=timeout, allow_redirects=True) as resp:
+                result.status = resp.status
+                # Lowercase keys: feedparser looks up 'content-type' to honour the declared charset
+                result.headers = {k.lower(): v for k, v in resp.headers.items()}
+                if resp.status == 304:
+                    result.not_modified = True
+                    return
+                if resp.status != 200:
+                    result.error = f"HTTP {resp.status}"
+                    return
+                body = await resp.read()
+                # Read validators from the case-insensitive headers (the plain dict copy keeps
+                # whatever casing the server sent, e.g. "Etag")
+                result.etag = resp.headers.get("ETag") or result.etag
+                result.last_modified = resp.headers.get("Last-Modified") or result.last_modified
+
+        # Servers without validators: fall back to comparing the body hash
+        body_hash = hashlib.sha256(body).hexdigest()
+        if body_hash == result.content_hash:
+            result.not_modified = True
+            return
+        result.content_hash = body_hash
+
+        # Parse outside the semaphores: parsing doesn't hold a connection.
+        # Pass response headers so feedparser can honour the declared charset.
+        result.feed = await asyncio.to_thread(
+            feedparser.parse, body, response_headers=result.headers
+        )
+
+    async def fetch_all(self, feeds: List[Tuple[str, str]], states: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Fetches every (url, language) pair concurrently and yields FeedResults as they complete,
+        so callers can start processing the fastest feeds while slow ones are still in flight.
+        `states` maps feed url -> {"etag", "last_modified", "content_hash"} from the previous run.
+        """
+        states = states or {}
+        tasks = [asyncio.ensure_future(self.fetch(url, lang, states.get(url))) for url, lang in feeds]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for t in tasks:
+                if not t.done():
+                    t.cancel()
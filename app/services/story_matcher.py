@@ -0,0 +1,48 @@
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import get_settings
+from app.services.vector_store import HashingEmbedder
+
+settings = get_settings()
+
+
+def story_text(row: Any) -> str:
+    # Title words are the strongest topic signal, so they're counted twice
+    return f"{row.title} {row.title} {row.content_clean or ''}"
+
+
+def match_stories(
+    gov: Sequence[Any],
+    independent: Sequence[Any],
+    threshold: Optional[float] = None,
+    max_matches: Optional[int] = None,
+) -> List[Tuple[Any, List[Any]]]:
+    """
+    Pairs each government article with the independent articles covering the same story.
+    TF-IDF (hashed words + char n-grams, IDF fitted on this week's corpus) cosine similarity,
+    computed as one dense gov x independent matrix product. Char n-grams make it work on
+    Telugu as well as English; matching is within a script, not a translation.
+    Returns [(gov_row, [independent_row, ...])] for gov articles with at least one match,
+    strongest clusters first.
+    """
+    threshold = settings.VALIDATION_MATCH_THRESHOLD if threshold is None else threshold
+    max_matches = max_matches or settings.VALIDATION_MAX_MATCHES
+    if not gov or not independent:
+        return []
+
+    embedder = HashingEmbedder().fit_idf([story_text(r) for r in [*gov, *independent]])
+    gov_vecs = embedder.embed([story_text(r) for r in gov])
+    ind_vecs = embedder.embed([story_text(r) for r in independent])
+    similarity = gov_vecs @ ind_vecs.T
+
+    clusters = []
+    for i, scores in enumerate(similarity):
+        top = np.argsort(-scores)[:max_matches]
+        matched = [j for j in top if scores[j] >= threshold]
+        if matched:
+            clusters.append((float(scores[matched[0]]), gov[i], [independent[j] for j in matched]))
+
+    clusters.sort(key=lambda c: -c[0])
+    return [(g, inds) for _, g, inds in clusters]
@@ -1 +1,283 @@
-# Skeleton file: vector_store.py
+import json
+import os
+import re
+import threading
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import structlog
+
+from app.config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class HashingEmbedder:
+    """
+    Offline, CPU-only text embeddings via the hashing trick.
+    Features: lowercase words plus character n-grams inside each word (n-grams make Telugu
+    inflections and English plurals overlap), hashed into `dim` signed buckets, sublinear TF,
+    optional IDF weights, then L2-normalized so dot product == cosine similarity.
+    Deterministic and stateless: vectors computed in different runs are comparable.
+    """
+
+    def __init__(self, dim: Optional[int] = None, char_ngram: int = 3):
+        self.dim = dim or settings.EMBEDDING_DIM
+        self.char_ngram = char_ngram
+        self.idf: Optional[np.ndarray] = None
+
+    def _features(self, text: str) -> Dict[int, float]:
+        counts: Dict[int, float] = {}
+        n = self.char_ngram
+        for word in _WORD_RE.findall((text or "").lower()):
+            grams = [word]
+            if len(word) > n:
+                padded = f"<{word}>"
+                grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+            for gram in grams:
+                h = zlib.crc32(gram.encode("utf-8"))
+                # Low bits pick the bucket, one high bit picks the sign (reduces collision bias)
+                idx = h % self.dim
+                counts[idx] = counts.get(idx, 0.0) + (1.0 if h & 0x80000000 else -1.0)
+        return counts
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for idx, value in self._features(text).items():
+                matrix[row, idx] = value
+        # Sublinear TF, sign preserved
+        np.copysign(np.log1p(np.abs(matrix)), matrix, out=matrix)
+        if self.idf is not None:
+            matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return matrix
+
+    def fit_idf(self, texts: Sequence[str]) -> "HashingEmbedder":
+        """IDF over hashed buckets for a fixed corpus (e.g. one week of articles)."""
+        df = np.zeros(self.dim, dtype=np.float32)
+        for text in texts:
+            df[list(self._features(text).keys())] += 1
+        self.idf = np.log((1 + len(texts)) / (1 + df)).astype(np.float32) + 1.0
+        return self
+
+
+class VectorStore:
+    """
+    In-process vector store.
+    - Vectors: one contiguous float32 matrix memory-mapped at <dir>/vectors.f32, grown by doubling.
+    - Ids: <dir>/ids.txt (row order) + an in-memory id -> row map.
+    - Search: batched exact cosine top-k in blocks, or an optional IVF index (spherical k-means
+      coarse quantizer, <dir>/ivf_*.npy) that probes only the nearest lists for large corpora.
+    Vectors are expected to be L2-normalized (HashingEmbedder output).
+    """
+
+    BLOCK_ROWS = 65536
+
+    def __init__(self, path: Optional[str] = None, dim: Optional[int] = None):
+        self.path = path or settings.VECTOR_STORE_DIR
+        self.dim = dim or settings.EMBEDDING_DIM
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._matrix: Optional[np.memmap] = None
+        self._capacity = 0
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments: Optional[np.ndarray] = None
+        self._load()
+
+    # --- persistence -------------------------------------------------------
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        meta_path = self._file("meta.json")
+        if not os.path.exists(meta_path):
+            open(self._file("ids.txt"), "w", encoding="utf-8").close()
+            self._resize(1024)
+            return
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["dim"] != self.dim:
+            raise ValueError(f"Vector store at {self.path} has dim {meta['dim']}, expected {self.dim}")
+        with open(self._file("ids.txt"), "r", encoding="utf-8") as f:
+            lines = [line.rstrip("\n") for line in f]
+        self._ids = lines[:meta["count"]]
+        if len(lines) > len(self._ids):
+            # An append that crashed before meta.json was updated - drop the unconfirmed tail
+            with open(self._file("ids.txt"), "w", encoding="utf-8") as f:
+                f.writelines(item_id + "\n" for item_id in self._ids)
+        self._rows = {article_id: row for row, article_id in enumerate(self._ids)}
+        self._capacity = meta["capacity"]
+        self._matrix = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r+", shape=(self._capacity, self.dim))
+        if os.path.exists(self._file("ivf_centroids.npy")):
+            self._centroids = np.load(self._file("ivf_centroids.npy"))
+            assignments = np.load(self._file("ivf_assignments.npy"))
+            # Rows appended after the last save are assigned lazily
+            self._assignments = np.concatenate([assignments, self._assign(len(assignments), len(self._ids))])
+
+    def _resize(self, capacity: int):
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+        with open(self._file("vectors.f32"), "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        self._matrix = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._capacity = capacity
+
+    def flush(self):
+        with self._lock:
+            self._matrix.flush()
+            with open(self._file("meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"dim": self.dim, "count": len(self._ids), "capacity": self._capacity}, f)
+            if self._centroids is not None:
+                np.save(self._file("ivf_centroids.npy"), self._centroids)
+                np.save(self._file("ivf_assignments.npy"), self._assignments)
+
+    # --- writes ------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._rows
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray) -> int:
+        """Appends vectors for ids not already stored. Returns how many were added."""
+        with self._lock:
+            fresh, seen = [], set()
+            for i, item_id in enumerate(ids):
+                if item_id not in self._rows and item_id not in seen:
+                    fresh.append((i, item_id))
+                    seen.add(item_id)
+            if not fresh:
+                return 0
+            start = len(self._ids)
+            needed = start + len(fresh)
+            if needed > self._capacity:
+                self._resize(max(needed, self._capacity * 2))
+            self._matrix[start:needed] = vectors[[i for i, _ in fresh]].astype(np.float32)
+            with open(self._file("ids.txt"), "a", encoding="utf-8") as f:
+                for _, item_id in fresh:
+                    f.write(item_id + "\n")
+            for offset, (_, item_id) in enumerate(fresh):
+                self._rows[item_id] = start + offset
+                self._ids.append(item_id)
+            if self._centroids is not None:
+                self._assignments = np.concatenate([self._assignments, self._assign(start, needed)])
+            self.flush()
+            return len(fresh)
+
+    def get(self, ids: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+        """Returns (found_ids, matrix) for the ids present in the store."""
+        found = [item_id for item_id in ids if item_id in self._rows]
+        rows = [self._rows[item_id] for item_id in found]
+        return found, np.asarray(self._matrix[rows]) if rows else np.zeros((0, self.dim), dtype=np.float32)
+
+    # --- IVF ---------------------------------------------------------------
+
+    def _assign(self, start: int, end: int) -> np.ndarray:
+        if end <= start:
+            return np.zeros(0, dtype=np.int32)
+        return np.argmax(np.asarray(self._matrix[start:end]) @ self._centroids.T, axis=1).astype(np.int32)
+
+    def build_ivf(self, n_lists: Optional[int] = None, iterations: int = 10, sample: int = 100000, seed: int = 0):
+        """Trains spherical k-means centroids on a sample and assigns every row to its nearest list."""
+        with self._lock:
+            count = len(self._ids)
+            if count == 0:
+                return
+            n_lists = n_lists or settings.VECTOR_IVF_LISTS or max(1, int(np.sqrt(count)))
+            rng = np.random.default_rng(seed)
+            idx = rng.choice(count, size=min(sample, count), replace=False)
+            data = np.asarray(self._matrix[np.sort(idx)])
+            centroids = data[rng.choice(len(data), size=min(n_lists, len(data)), replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(data @ centroids.T, axis=1)
+                for c in range(len(centroids)):
+                    members = data[labels == c]
+                    if len(members):
+                        centroid = members.sum(axis=0)
+                        norm = np.linalg.norm(centroid)
+                        if norm:
+                            centroids[c] = centroid / norm
+            self._centroids = centroids.astype(np.float32)
+            self._assignments = np.concatenate([
+                self._assign(s, min(s + self.BLOCK_ROWS, count)) for s in range(0, count, self.BLOCK_ROWS)
+            ])
+            self.flush()
+            logger.info("vector_ivf_built", rows=count, lists=len(self._centroids))
+
+    # --- search ------------------------------------------------------------
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int = 10,
+        candidate_ids: Optional[Iterable[str]] = None,
+        n_probe: Optional[int] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Batched cosine top-k. Returns, per query row, [(id, score), ...] best first.
+        candidate_ids restricts the search to a subset (e.g. one domain's articles).
+        """
+        queries = np.atleast_2d(queries).astype(np.float32)
+        with self._lock:
+            if candidate_ids is not None:
+                ids, matrix = self.get(list(candidate_ids))
+                return [self._top_k(scores, ids, k) for scores in queries @ matrix.T]
+
+            count = len(self._ids)
+            use_ivf = self._centroids is not None and count >= settings.VECTOR_IVF_MIN_ROWS
+            if use_ivf:
+                return self._search_ivf(queries, k, n_probe or settings.VECTOR_IVF_PROBES)
+
+            best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+            best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+            for start in range(0, count, self.BLOCK_ROWS):
+                block = np.asarray(self._matrix[start:min(start + self.BLOCK_ROWS, count)])
+                scores = queries @ block.T
+                best_scores = np.concatenate([best_scores, scores], axis=1)
+                best_rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, start + len(block)), scores.shape)], axis=1)
+                if best_scores.shape[1] > k:
+                    keep = np.argpartition(-best_scores, k, axis=1)[:, :k]
+                    best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                    best_rows = np.take_along_axis(best_rows, keep, axis=1)
+            results = []
+            for scores, rows in zip(best_scores, best_rows):
+                order = np.argsort(-scores)
+                results.append([(self._ids[rows[i]], float(scores[i])) for i in order])
+            return results
+
+    def _search_ivf(self, queries: np.ndarray, k: int, n_probe: int) -> List[List[Tuple[str, float]]]:
+        nearest_lists = np.argsort(-(queries @ self._centroids.T), axis=1)[:, :n_probe]
+        results = []
+        for query, lists in zip(queries, nearest_lists):
+            rows = np.flatnonzero(np.isin(self._assignments, lists))
+            ids = [self._ids[r] for r in rows]
+            scores = np.asarray(self._matrix[rows]) @ query if len(rows) else np.zeros(0, dtype=np.float32)
+            results.append(self._top_k(scores, ids, k))
+        return results
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, ids: List[str], k: int) -> List[Tuple[str, float]]:
+        if len(ids) == 0:
+            return []
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(ids[i], float(scores[i])) for i in top]
+
+
+@lru_cache()
+def get_vector_store() -> VectorStore:
+    return VectorStore()
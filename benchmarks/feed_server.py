@@ -0,0 +1,150 @@
+"""
+Synthetic RSS feeds for offline benchmarks.
+
+Serves `feeds` English/Telugu feeds of `items` entries each, generated deterministically from a
+seed, so every run of a benchmark sees byte-identical feeds (ETag/Last-Modified and 304s work).
+Articles are drawn from shared "stories" per domain, so the same story shows up in gov and
+independent feeds (exercises validation matching) and a share of entries are verbatim syndicated
+copies (exercises dedup).
+
+    python -m benchmarks.feed_server --port 8701 --feeds 20 --items 50
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+from dataclasses import dataclass
+from email.utils import formatdate
+from typing import Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from aiohttp import web
+
+DOMAIN_VOCAB = {
+    "Politics": "election parliament minister opposition coalition rally manifesto assembly vote campaign speaker cabinet",
+    "Economy": "inflation budget gdp exports rupee tax investment market subsidy growth fiscal deficit",
+    "Environment": "monsoon flood pollution forest climate emissions drought river wildlife heatwave coastal cyclone",
+    "Technology": "startup semiconductor digital satellite software broadband artificial intelligence data fintech mobile",
+    "Law & Governance": "court verdict petition bench constitution ordinance police tribunal bail judiciary regulation",
+}
+FILLER = "the a of to in and on for with by from at said officials reported statement week district state national".split()
+TELUGU_WORDS = (
+    "ప్రభుత్వం ముఖ్యమంత్రి ఎన్నికలు బడ్జెట్ రైతులు వర్షాలు కోర్టు తీర్పు పథకం అభివృద్ధి "
+    "జిల్లా రాష్ట్రం ప్రజలు నీటి విద్యుత్ ఆర్థిక సాంకేతిక పరిశ్రమ పెట్టుబడి వ్యవసాయం"
+).split()
+# Gov feeds live under a path containing "pib.gov", which is how ingestion tags source_type
+GOV_PREFIX = "pib.gov"
+
+
+@dataclass
+class Story:
+    domain: str
+    terms: List[str]
+
+
+def feed_paths(feeds: int, telugu_share: float, gov_share: float, seed: int) -> List[Tuple[str, str]]:
+    """[(path, language)] - the feed list, independent of per-feed content settings."""
+    rng = random.Random(seed)
+    paths = []
+    for n in range(feeds):
+        lang = "te" if n < round(feeds * telugu_share) else "en"
+        kind = GOV_PREFIX if rng.random() < gov_share else "news"
+        paths.append((f"/{kind}/{lang}/{n}.xml", lang))
+    return paths
+
+
+def build_feeds(feeds: int, items: int, telugu_share: float, gov_share: float, dup_rate: float, seed: int,
+                now: Optional[float] = None) -> Dict[str, bytes]:
+    """Returns {path: rss_bytes}. Deterministic for a given argument set and `now`.
+    Entries are dated within the last two days of `now`, inside the validation window."""
+    rng = random.Random(seed)
+    base = int(now if now is not None else time.time()) - 2 * 86400
+    stories = []
+    for _ in range(max(1, feeds * items // 4)):
+        domain = rng.choice(list(DOMAIN_VOCAB))
+        stories.append(Story(domain, rng.sample(DOMAIN_VOCAB[domain].split(), 5)))
+
+    paths = feed_paths(feeds, telugu_share, gov_share, seed)
+    published: Dict[str, List[Tuple[str, str]]] = {"en": [], "te": []} # (title, body) per language, for syndication
+    out = {}
+    for n, (path, lang) in enumerate(paths):
+        entries = []
+        for i in range(items):
+            if published[lang] and rng.random() < dup_rate:
+                title, body = rng.choice(published[lang])
+            else:
+                story = rng.choice(stories)
+                title, body = _article(rng, story, lang)
+                published[lang].append((title, body))
+            link = f"http://bench.local/{n}/{i}"
+            pub = formatdate(base + (n * items + i) * 172800 // max(1, feeds * items), usegmt=True)
+            entries.append(
+                f"<item><title>{escape(title)}</title><link>{link}</link><pubDate>{pub}</pubDate>"
+                f"<description>{escape(body)}</description></item>"
+            )
+        out[path] = (
+            "<?xml version='1.0' encoding='UTF-8'?><rss version='2.0'><channel>"
+            f"<title>Bench feed {n}</title><link>http://bench.local/{n}</link>{''.join(entries)}</channel></rss>"
+        ).encode("utf-8")
+    return out
+
+
+def _article(rng: random.Random, story: Story, lang: str) -> Tuple[str, str]:
+    if lang == "te":
+        words = [rng.choice(TELUGU_WORDS) for _ in range(rng.randint(60, 120))]
+        title = " ".join(rng.sample(TELUGU_WORDS, 4))
+    else:
+        vocab = DOMAIN_VOCAB[story.domain].split()
+        words = [rng.choice(story.terms) if rng.random() < 0.3 else rng.choice(vocab + FILLER) for _ in range(rng.randint(60, 120))]
+        title = " ".join(story.terms[:3]).title() + f" {rng.randint(1, 999)}"
+    paragraphs = [" ".join(words[i:i + 30]) for i in range(0, len(words), 30)]
+    return title, "".join(f"<p>{p}.</p>" for p in paragraphs)
+
+
+def build_app(feeds: Dict[str, bytes], latency_ms: float = 0.0) -> web.Application:
+    etags = {path: '"' + hashlib.sha256(body).hexdigest()[:16] + '"' for path, body in feeds.items()}
+    last_modified = formatdate(time.time(), usegmt=True)
+
+    async def handle(request: web.Request) -> web.Response:
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        path = request.path
+        if path not in feeds:
+            return web.Response(status=404)
+        if request.headers.get("If-None-Match") == etags[path]:
+            return web.Response(status=304, headers={"ETag": etags[path]})
+        return web.Response(
+            body=feeds[path],
+            content_type="application/rss+xml",
+            charset="utf-8",
+            headers={"ETag": etags[path], "Last-Modified": last_modified},
+        )
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handle)
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--feeds", type=int, default=20)
+    parser.add_argument("--items", type=int, default=50, help="Entries per feed")
+    parser.add_argument("--telugu-share", type=float, default=0.3)
+    parser.add_argument("--gov-share", type=float, default=0.3)
+    parser.add_argument("--dup-rate", type=float, default=0.1, help="Share of entries that are syndicated copies")
+    parser.add_argument("--feed-latency-ms", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=7)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8701)
+    add_arguments(parser)
+    args = parser.parse_args()
+    feeds = build_feeds(args.feeds, args.items, args.telugu_share, args.gov_share, args.dup_rate, args.seed)
+    web.run_app(build_app(feeds, args.feed_latency_ms), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Offline end-to-end pipeline benchmark.
+
+Starts the synthetic feed server and the stub LLM as subprocesses, then runs
+`run_full_pipeline` once per run in a fresh process per backend (settings are read at import,
+so each backend needs its own interpreter). Per run it records:
+- wall time, and per stage: status, seconds, reported counts and items/second
+- LLM request count, p50/p99 latency, outcomes, tokens
+- feed fetch count, p50/p99 latency, statuses
+- DB round trips (statements executed) by verb, p50/p99 statement latency
+- cache hits/misses, peak RSS (main process, and cleaning worker processes)
+Latency quantiles are estimated from the app's Prometheus histograms, the same way
+histogram_quantile does. Results go to a JSON file for regression comparison.
+
+    python -m benchmarks.run --runs 2
+    python -m benchmarks.run --backends sqlite,postgres --postgres-url postgresql://u:p@localhost/bench_scratch
+
+The Postgres database is wiped (drop_all) before the run: point it at a throwaway database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks import feed_server, stub_llm
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+
+# --- histogram helpers (run in the child) ---------------------------------------
+
+Snapshot = Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]
+
+
+def _snapshot(registry) -> Snapshot:
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for metric in registry.collect()
+        for sample in metric.samples
+    }
+
+
+def _delta(before: Snapshot, after: Snapshot) -> Snapshot:
+    return {key: value - before.get(key, 0.0) for key, value in after.items() if value - before.get(key, 0.0)}
+
+
+def _select(delta: Snapshot, name: str, **match) -> List[Tuple[Dict[str, str], float]]:
+    out = []
+    for (sample_name, labels), value in delta.items():
+        labels = dict(labels)
+        if sample_name == name and all(labels.get(k) == v for k, v in match.items()):
+            out.append((labels, value))
+    return out
+
+
+def _quantile(delta: Snapshot, histogram: str, q: float, **match) -> Optional[float]:
+    """histogram_quantile over the run's bucket deltas, summed across all other labels."""
+    buckets: Dict[float, float] = {}
+    for labels, value in _select(delta, f"{histogram}_bucket", **match):
+        le = float(labels["le"])
+        buckets[le] = buckets.get(le, 0.0) + value
+    if not buckets:
+        return None
+    bounds = sorted(buckets)
+    total = buckets[bounds[-1]]
+    if not total:
+        return None
+    rank = q * total
+    previous_bound, previous_count = 0.0, 0.0
+    for bound in bounds:
+        count = buckets[bound]
+        if count >= rank:
+            if bound == float("inf"):
+                return previous_bound
+            width = count - previous_count
+            fraction = (rank - previous_count) / width if width else 1.0
+            return round(previous_bound + (bound - previous_bound) * fraction, 6)
+        previous_bound, previous_count = bound, count
+    return previous_bound
+
+
+def _by_label(delta: Snapshot, name: str, label: str) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for labels, value in _select(delta, name):
+        out[labels.get(label, "")] = out.get(labels.get(label, ""), 0.0) + value
+    return out
+
+
+def _summarize(result: Dict[str, Any], delta: Snapshot, wall: float) -> Dict[str, Any]:
+    stages = {}
+    for name, stage in result["stages"].items():
+        seconds = stage["duration_seconds"]
+        counts = {
+            k: v for k, v in (stage["output"] or {}).items()
+            if isinstance(v, (int, float)) and not isinstance(v, bool)
+        }
+        stages[name] = {
+            "status": stage["status"],
+            "seconds": seconds,
+            "counts": counts,
+            "items_per_second": {k: round(v / seconds, 2) for k, v in counts.items() if seconds and v} if seconds else {},
+        }
+    llm_requests = sum(_by_label(delta, "llm_request_duration_seconds_count", "status").values())
+    feed_fetches = sum(_by_label(delta, "feed_fetch_duration_seconds_count", "status").values())
+    db_by_verb = _by_label(delta, "db_query_duration_seconds_count", "verb")
+    return {
+        "status": result["status"],
+        "wall_seconds": round(wall, 3),
+        "stages": stages,
+        "llm": {
+            "requests": int(llm_requests),
+            "p50_seconds": _quantile(delta, "llm_request_duration_seconds", 0.5),
+            "p99_seconds": _quantile(delta, "llm_request_duration_seconds", 0.99),
+            "by_status": _by_label(delta, "llm_request_duration_seconds_count", "status"),
+            "calls_by_outcome": _by_label(delta, "llm_calls_total", "outcome"),
+            "tokens": _by_label(delta, "llm_tokens_total", "kind"),
+        },
+        "feeds": {
+            "fetches": int(feed_fetches),
+            "p50_seconds": _quantile(delta, "feed_fetch_duration_seconds", 0.5),
+            "p99_seconds": _quantile(delta, "feed_fetch_duration_seconds", 0.99),
+            "by_status": _by_label(delta, "feed_fetch_duration_seconds_count", "status"),
+        },
+        "db": {
+            "round_trips": int(sum(db_by_verb.values())),
+            "by_verb": db_by_verb,
+            "p50_seconds": _quantile(delta, "db_query_duration_seconds", 0.5),
+            "p99_seconds": _quantile(delta, "db_query_duration_seconds", 0.99),
+            "errors": int(sum(_by_label(delta, "db_query_errors_total", "verb").values())),
+        },
+        "cache": {
+            cache: {"hits": int(v.get("hit", 0)), "misses": int(v.get("miss", 0))}
+            for cache, v in _cache_table(delta).items()
+        },
+    }
+
+
+def _cache_table(delta: Snapshot) -> Dict[str, Dict[str, float]]:
+    table: Dict[str, Dict[str, float]] = {}
+    for labels, value in _select(delta, "cache_lookups_total"):
+        table.setdefault(labels["cache"], {})[labels["result"]] = value
+    return table
+
+
+def _peak_rss_mb(who: int) -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def _child(config: Dict[str, Any]):
+    # Imported here: the parent sets DATABASE_URL etc. in our environment before we start
+    from app.core import metrics
+    from app.core.llm_client import close_http_session
+    from app.db.models import Base
+    from app.db.session import engine, init_db
+    from app.main import run_full_pipeline
+
+    if not metrics.ENABLED:
+        raise SystemExit("METRICS_ENABLED must be on for benchmarks")
+    if config["backend"] == "postgres":
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+    await init_db()
+
+    runs = []
+    for n in range(config["runs"]):
+        before = _snapshot(metrics.REGISTRY)
+        started = time.perf_counter()
+        result = await run_full_pipeline()
+        wall = time.perf_counter() - started
+        if result is None:
+            raise SystemExit("Pipeline lock was busy")
+        summary = _summarize(result, _delta(before, _snapshot(metrics.REGISTRY)), wall)
+        summary["run"] = n + 1
+        summary["peak_rss_mb"] = _peak_rss_mb(resource.RUSAGE_SELF)
+        runs.append(summary)
+
+    await close_http_session()
+    await engine.dispose()
+    with open(config["output"], "w", encoding="utf-8") as f:
+        json.dump({
+            "runs": runs,
+            "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+            "workers_peak_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+        }, f, indent=2, default=str)
+
+
+# --- orchestration (parent) ---------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start within {timeout}s")
+
+
+def _start(module: str, port: int, extra: List[str]) -> subprocess.Popen:
+    proc = subprocess.Popen([sys.executable, "-m", module, "--port", str(port), *extra], cwd=REPO_ROOT)
+    _wait_for_port(port)
+    return proc
+
+
+def _write_sources(path: str, feed_port: int, args: argparse.Namespace):
+    paths = feed_server.feed_paths(args.feeds, args.telugu_share, args.gov_share, args.seed)
+    english = [f"http://127.0.0.1:{feed_port}{p}" for p, lang in paths if lang == "en"]
+    telugu = [f"http://127.0.0.1:{feed_port}{p}" for p, lang in paths if lang == "te"]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"english": english, "telugu": telugu}, f) # JSON is valid YAML
+
+
+def _child_env(workdir: str, db_url: str, feed_port: int, llm_port: int, args: argparse.Namespace) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": db_url,
+        "SOURCES_PATH": os.path.join(workdir, "sources.yaml"),
+        "REPORTS_DIR": os.path.join(workdir, "reports"),
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.sqlite3"),
+        "VECTOR_STORE_DIR": os.path.join(workdir, "vectors"),
+        "PIPELINE_LOCK_PATH": os.path.join(workdir, "pipeline.lock"),
+        "DOMAIN_LOCAL_MODEL_PATH": os.path.join(workdir, "domain_classifier.npz"),
+        "OPENROUTER_API_KEY": "benchmark",
+        "LLM_BASE_URL": f"http://127.0.0.1:{llm_port}/api/v1",
+        "LLM_CACHE_ENABLED": str(args.llm_cache).lower(),
+        "PIPELINE_STREAMING": str(args.streaming).lower(),
+        "METRICS_ENABLED": "true",
+        "SUPABASE_URL": "",
+        "SUPABASE_KEY": "",
+    })
+    if not args.keep_rate_limits:
+        # Measure the pipeline, not our own throttle
+        env.update({"LLM_REQUESTS_PER_MINUTE": "0", "LLM_TOKENS_PER_MINUTE": "0"})
+    return env
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_summary(results: Dict[str, Any]):
+    for backend, data in results["backends"].items():
+        if "error" in data:
+            print(f"[{backend}] FAILED: {data['error']}")
+            continue
+        for run in data["runs"]:
+            stages = " ".join(f"{name}={s['seconds']}s" for name, s in run["stages"].items())
+            print(
+                f"[{backend} run {run['run']}] {run['status']} wall={run['wall_seconds']}s | {stages} | "
+                f"llm n={run['llm']['requests']} p50={run['llm']['p50_seconds']} p99={run['llm']['p99_seconds']} | "
+                f"db round_trips={run['db']['round_trips']} | rss={run['peak_rss_mb']}MB"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="sqlite", help="Comma-separated: sqlite, postgres")
+    parser.add_argument("--postgres-url", default=os.getenv("BENCH_POSTGRES_URL", ""))
+    parser.add_argument("--runs", type=int, default=2, help="Runs per backend; run 2+ measures the incremental (304) path")
+    parser.add_argument("--streaming", action="store_true", help="PIPELINE_STREAMING=true")
+    parser.add_argument("--llm-cache", action="store_true", help="Keep the LLM response cache on")
+    parser.add_argument("--keep-rate-limits", action="store_true")
+    parser.add_argument("--output", default=None, help="Results JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--keep-workdir", action="store_true")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    feed_server.add_arguments(parser)
+    stub_llm.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.child:
+        with open(args.child, "r", encoding="utf-8") as f:
+            asyncio.run(_child(json.load(f)))
+        return
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if "postgres" in backends and not args.postgres_url:
+        parser.error("--postgres-url (or BENCH_POSTGRES_URL) is required for the postgres backend")
+
+    feed_port, llm_port = _free_port(), _free_port()
+    servers = []
+    results = {
+        "started_at": datetime.utcnow().isoformat(),
+        "git_commit": _git_commit(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("child", "postgres_url")},
+        "backends": {},
+    }
+    try:
+        servers.append(_start("benchmarks.feed_server", feed_port, [
+            "--feeds", str(args.feeds), "--items", str(args.items), "--telugu-share", str(args.telugu_share),
+            "--gov-share", str(args.gov_share), "--dup-rate", str(args.dup_rate),
+            "--feed-latency-ms", str(args.feed_latency_ms), "--seed", str(args.seed),
+        ]))
+        servers.append(_start("benchmarks.stub_llm", llm_port, [
+            "--llm-latency-ms", str(args.llm_latency_ms), "--llm-jitter-ms", str(args.llm_jitter_ms),
+            "--llm-error-rate", str(args.llm_error_rate), "--seed", str(args.seed),
+            *(["--no-usage"] if args.no_usage else []),
+        ]))
+
+        for backend in backends:
+            workdir = tempfile.mkdtemp(prefix=f"bench-{backend}-")
+            try:
+                _write_sources(os.path.join(workdir, "sources.yaml"), feed_port, args)
+                db_url = f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}" if backend == "sqlite" else args.postgres_url
+                config_path, output_path = os.path.join(workdir, "child.json"), os.path.join(workdir, "result.json")
+                with open(config_path, "w", encoding="utf-8") as f:
+                    json.dump({"backend": backend, "runs": args.runs, "output": output_path}, f)
+                proc = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.run", "--child", config_path],
+                    cwd=REPO_ROOT, env=_child_env(workdir, db_url, feed_port, llm_port, args),
+                )
+                if proc.returncode != 0 or not os.path.exists(output_path):
+                    results["backends"][backend] = {"error": f"benchmark process exited with {proc.returncode}"}
+                    continue
+                with open(output_path, "r", encoding="utf-8") as f:
+                    results["backends"][backend] = json.load(f)
+            finally:
+                if not args.keep_workdir:
+                    shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait(timeout=10)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    _print_summary(results)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
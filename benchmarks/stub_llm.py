@@ -0,0 +1,109 @@
+"""
+OpenRouter-compatible stub for offline benchmarks.
+
+POST /api/v1/chat/completions answers each agent's prompt in the format that agent parses
+(batch/single classification, narrative SUMMARY/SENTIMENT, validation CONFLICT lines, ideas),
+after a configurable latency, with an optional share of 429/500 errors (429s carry Retry-After)
+and an optional `usage` block. Point the app at it with LLM_BASE_URL=http://host:port/api/v1.
+
+    python -m benchmarks.stub_llm --port 8702 --latency-ms 300 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import re
+
+from aiohttp import web
+
+DOMAINS = ["Politics", "Economy", "Environment", "Technology", "Law & Governance"]
+# Batch classification rows: "<id>|<title>|<snippet>" under an "ID|TITLE|SNIPPET" header
+BATCH_ROW_RE = re.compile(r'^(\d+)\|([^|]*)\|', re.MULTILINE)
+STORY_RE = re.compile(r'^STORY (\d+)', re.MULTILINE)
+
+
+def _domain_for(text: str) -> str:
+    # Stable per input, so cached and uncached runs agree
+    return DOMAINS[int(hashlib.md5(text.encode("utf-8")).hexdigest(), 16) % len(DOMAINS)]
+
+
+def answer(prompt: str) -> str:
+    if "ID|TITLE|SNIPPET" in prompt:
+        return "\n".join(f"{idx} -> {_domain_for(title)}" for idx, title in BATCH_ROW_RE.findall(prompt))
+    if "Return ONLY the category name" in prompt:
+        return _domain_for(prompt)
+    if "SUMMARY:" in prompt and "SENTIMENT:" in prompt:
+        return "SUMMARY: Coverage this week centred on a handful of recurring stories with broadly consistent reporting.\nSENTIMENT: Neutral"
+    if "CONFLICT:" in prompt:
+        stories = STORY_RE.findall(prompt)
+        if not stories or int(hashlib.md5(prompt.encode("utf-8")).hexdigest(), 16) % 3:
+            return "NO_CONFLICT"
+        return f"CONFLICT: Story {stories[0]} | GOVT: Scheme on track | INDEP: Delays reported | VERDICT: Tone contrast"
+    return "\n".join(
+        f"{n}. **Idea {n}** | *Opportunity:* Recurring coverage gap | *Idea:* Build a tracker for it" for n in range(1, 11)
+    )
+
+
+def build_app(latency_ms: float = 300.0, jitter_ms: float = 100.0, error_rate: float = 0.0,
+              usage: bool = True, seed: int = 7) -> web.Application:
+    rng = random.Random(seed)
+    stats = {"requests": 0, "errors": 0}
+
+    async def completions(request: web.Request) -> web.Response:
+        payload = await request.json()
+        stats["requests"] += 1
+        delay = max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+
+        if error_rate and rng.random() < error_rate:
+            stats["errors"] += 1
+            if rng.random() < 0.5:
+                return web.json_response({"error": {"message": "Rate limited"}}, status=429, headers={"Retry-After": "1"})
+            return web.json_response({"error": {"message": "Upstream error"}}, status=500)
+
+        prompt = "\n".join(m.get("content", "") for m in payload.get("messages", []) if m.get("role") == "user")
+        content = answer(prompt)
+        body = {
+            "id": f"stub-{stats['requests']}",
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        }
+        if usage:
+            # Roughly 4 chars/token, like a real tokenizer on English
+            prompt_chars = sum(len(m.get("content", "")) for m in payload.get("messages", []))
+            body["usage"] = {
+                "prompt_tokens": prompt_chars // 4 + 1,
+                "completion_tokens": len(content) // 4 + 1,
+                "total_tokens": prompt_chars // 4 + len(content) // 4 + 2,
+            }
+        return web.json_response(body)
+
+    async def stats_handler(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/completions", completions)
+    app.router.add_get("/stats", stats_handler)
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--no-usage", action="store_true", help="Omit the usage block (exercises token estimation)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8702)
+    parser.add_argument("--seed", type=int, default=7)
+    add_arguments(parser)
+    args = parser.parse_args()
+    app = build_app(args.llm_latency_ms, args.llm_jitter_ms, args.llm_error_rate, not args.no_usage, args.seed)
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()